@@ -1,13 +1,18 @@
 #!/usr/bin/env python
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+import csv
 import numpy as np
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Page configuration
 st.set_page_config(
     page_title="Joe's Homebrew Recipe Builder",
@@ -26,51 +31,331 @@ if 'current_recipe' not in st.session_state:
 if 'navigate_to_page' not in st.session_state:
     st.session_state.navigate_to_page = None
 
+# Default for the brew date pickers, fixed once per session
+if 'brew_date_default' not in st.session_state:
+    st.session_state.brew_date_default = datetime.now().date()
+
+# Recipe deletions waiting to be written to disk (created_at ids, None if a recipe has none)
+if 'pending_deletes' not in st.session_state:
+    st.session_state.pending_deletes = []
+
 # Initialize entry gate state
 if 'entered_app' not in st.session_state:
     st.session_state.entered_app = False
 
 
-def calculate_og(grain_bill, batch_size):
-    """Calculate Original Gravity based on grain bill and batch size"""
-    total_points = 0
-    for grain in grain_bill:
-        # Points per kg per litre (typical extract efficiency ~70%)
-        # Convert from metric: ppg * 8.3454 for kg/L basis
-        points = grain['weight'] * grain['ppg'] * 8.3454 * 0.70
-        total_points += points
-    
-    og = 1 + (total_points / batch_size) / 1000
-    return round(og, 3)
+# Static reference tables
+_GRAIN_TYPES = {
+    "2-Row Pale Malt": {"ppg": 37, "lovibond": 2},
+    "Pilsner Malt": {"ppg": 37, "lovibond": 1.5},
+    "Munich Malt": {"ppg": 35, "lovibond": 9},
+    "Vienna Malt": {"ppg": 36, "lovibond": 4},
+    "Crystal 40L": {"ppg": 34, "lovibond": 40},
+    "Crystal 60L": {"ppg": 34, "lovibond": 60},
+    "Chocolate Malt": {"ppg": 34, "lovibond": 350},
+    "Roasted Barley": {"ppg": 28, "lovibond": 500},
+    "Wheat Malt": {"ppg": 38, "lovibond": 2},
+    "Flaked Oats": {"ppg": 33, "lovibond": 1}
+}
+_GRAIN_NAMES = tuple(_GRAIN_TYPES)
+_GRAIN_PPG = np.array([g['ppg'] for g in _GRAIN_TYPES.values()], dtype=np.float64)
+_GRAIN_LOVIBOND = np.array([g['lovibond'] for g in _GRAIN_TYPES.values()], dtype=np.float64)
 
+_HOP_VARIETIES = {
+    "Cascade": 5.5,
+    "Centennial": 10.0,
+    "Chinook": 13.0,
+    "Citra": 12.0,
+    "Mosaic": 12.5,
+    "Amarillo": 9.0,
+    "Simcoe": 13.0,
+    "Columbus": 15.0,
+    "Hallertau": 4.0,
+    "Saaz": 3.5
+}
+_HOP_NAMES = tuple(_HOP_VARIETIES)
+_HOP_ALPHA = np.array(list(_HOP_VARIETIES.values()), dtype=np.float64)
 
-def calculate_ibu(hop_additions, og, batch_size):
-    """Calculate IBU (International Bitterness Units)"""
-    total_ibu = 0
-    for hop in hop_additions:
-        # Tinseth formula approximation
-        utilization = 1.65 * (0.000125 ** (og - 1.0))
-        utilization *= (1 - np.exp(-0.04 * hop['time'])) / 4.15
-        
-        ibu = (hop['alpha_acid'] * hop['weight'] * utilization * 7490) / batch_size
-        total_ibu += ibu
+_YEAST_STRAINS = (
+    "US-05 (American Ale)",
+    "S-04 (English Ale)",
+    "WLP001 (California Ale)",
+    "WLP002 (English Ale)",
+    "WLP007 (Dry English Ale)",
+    "Safale S-33 (General Purpose)",
+    "Wyeast 1056 (American Ale)",
+    "Wyeast 1968 (London ESB)"
+)
+
+_CARBONATION_GUIDELINES = {
+    "Style": (
+        "British Style Ales",
+        "Belgian Ales",
+        "American Ales and Lager",
+        "Fruit Lambic",
+        "Porter, Stout",
+        "European Lagers",
+        "Lambic",
+        "German Wheat Beer"
+    ),
+    "CO2 Volumes": (
+        "1.5 - 2.0",
+        "1.9 - 2.4",
+        "2.2 - 2.7",
+        "3.0 - 4.5",
+        "1.7 - 2.3",
+        "2.2 - 2.7",
+        "2.4 - 2.8",
+        "3.3 - 4.5"
+    )
+}
+
+# Grams of priming sugar per litre to produce 1 volume of CO2
+# Corn sugar accounts for 91% fermentability, table sugar is 100% fermentable
+_SUGAR_FACTORS = {
+    "Corn Sugar (Dextrose)": 4.39,
+    "Table Sugar (Sucrose)": 4.0
+}
+
+
+# Tinseth boil-time factor for every whole minute from 0 to 120
+_UTIL_BY_MINUTE = (1 - np.exp(-0.04 * np.arange(0, 121))) / 4.15
+
+
+def _ibu_kernel(alpha, weights, times, og, batch_size):
+    """IBU from flat float64 arrays of alpha acids, hop weights and boil times"""
+    # Tinseth formula approximation, evaluated for all additions at once
+    # The gravity (bigness) factor only depends on OG, so compute it once
+    gravity_factor = 1.65 * (0.000125 ** (og - 1.0))
+    
+    # Flameout and dry-hop additions (time <= 0) add no bitterness, so clamp them onto the table's zero entry
+    times = np.maximum(times, 0.0)
+    
+    # Whole-minute boil times use the precomputed table; anything else falls back to exp
+    minutes = times.astype(np.intp)
+    if ((minutes == times) & (minutes < len(_UTIL_BY_MINUTE))).all():
+        utilization = gravity_factor * _UTIL_BY_MINUTE[minutes]
+    else:
+        utilization = gravity_factor * (1 - np.exp(-0.04 * times)) / 4.15
     
-    return round(total_ibu, 1)
+    ibu = (alpha * weights * utilization * 7490) / batch_size
+    return float(ibu.sum())
+
+
+def _og_srm_kernel(weights, ppgs, lovibonds, batch_size):
+    """OG and SRM together, reducing PPG and Lovibond against the grain weights in one dot product"""
+    points, mcu = np.dot(weights, np.column_stack((ppgs, lovibonds))).tolist()
+    og = 1 + (points * 8.3454 * 0.70 / batch_size) / 1000
+    srm = 1.4922 * ((mcu / batch_size) ** 0.6859)
+    return og, srm
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _og_srm_cached(weights, ppgs, lovibonds, batch_size):
+    """Cached fused OG/SRM calculation, hashing the grain weights only once"""
+    og, srm = _og_srm_kernel(weights, ppgs, lovibonds, batch_size)
+    return round(og, 3), round(srm, 1)
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _ibu_cached(alpha, weights, times, og, batch_size):
+    """Cached IBU calculation keyed on alpha acid, weight and boil time arrays"""
+    return round(_ibu_kernel(alpha, weights, times, og, batch_size), 1)
+
+
+def _column(rows, key):
+    """Extract one numeric field from a list of dicts as a float64 array"""
+    return np.fromiter((row[key] for row in rows), dtype=np.float64, count=len(rows))
+
 
+def _empty_grains():
+    """Empty structure-of-arrays grain bill"""
+    return {'type': [], 'weight': np.empty(0), 'ppg': np.empty(0), 'lovibond': np.empty(0)}
 
-def calculate_srm(grain_bill, batch_size):
-    """Calculate SRM (beer colour)"""
-    mcu = sum(grain['weight'] * grain['lovibond'] for grain in grain_bill) / batch_size
-    srm = 1.4922 * (mcu ** 0.6859)
-    return round(srm, 1)
 
+def _empty_hops():
+    """Empty structure-of-arrays hop schedule"""
+    return {'variety': [], 'weight': np.empty(0), 'time': np.empty(0), 'alpha_acid': np.empty(0)}
 
+
+def _to_records(columns):
+    """Convert parallel columns back into a list of row dicts for saving"""
+    values = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns.values()]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
 def calculate_abv(og, fg):
     """Calculate ABV (Alcohol By Volume)"""
     abv = (og - fg) * 131.25
     return round(abv, 2)
 
 
+# Saved recipes are kept in an append-only JSON Lines log: saves append the
+# recipe, deletes append a tombstone, and the log is compacted on load once
+# enough tombstones have built up.
+RECIPES_FILE = 'data/recipes/recipes.jsonl'
+LEGACY_RECIPES_FILE = 'data/recipes/recipes.json'
+COMPACT_AFTER_DELETES = 20
+
+
+def _json_dumps(obj):
+    """Serialize to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data):
+    """Parse JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _append_records(records):
+    """Append records to the recipe log, one JSON document per line"""
+    os.makedirs(os.path.dirname(RECIPES_FILE), exist_ok=True)
+    with open(RECIPES_FILE, 'ab') as f:
+        f.write(b''.join(_json_dumps(r) + b'\n' for r in records))
+
+
+def _write_recipe_log(recipes):
+    """Atomically rewrite the recipe log so it contains only the given recipes"""
+    os.makedirs(os.path.dirname(RECIPES_FILE), exist_ok=True)
+    # Write to a temp file and rename over the log so a crash never leaves it half-written
+    tmp_path = RECIPES_FILE + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(b''.join(_json_dumps(r) + b'\n' for r in recipes))
+    os.replace(tmp_path, RECIPES_FILE)
+
+
+@st.cache_data(show_spinner=False)
+def _read_recipe_log(mtime):
+    """Parse the recipe log, cached until the file modification time changes"""
+    records = []
+    deleted = set()
+    with open(RECIPES_FILE, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = _json_loads(line)
+            if '_deleted' in record:
+                deleted.add(record['_deleted'])
+            else:
+                records.append(record)
+    
+    recipes = [_normalize_recipe(r) for r in records if r.get('created_at') not in deleted]
+    return recipes, len(deleted)
+
+
+def load_recipes():
+    """Load saved recipes, migrating the old JSON file and compacting the log when needed"""
+    if not os.path.exists(RECIPES_FILE):
+        if not os.path.exists(LEGACY_RECIPES_FILE):
+            return []
+        with open(LEGACY_RECIPES_FILE, 'rb') as f:
+            recipes = _json_loads(f.read())
+        _write_recipe_log(recipes)
+        return [_normalize_recipe(r) for r in recipes]
+    
+    recipes, tombstones = _read_recipe_log(os.path.getmtime(RECIPES_FILE))
+    if tombstones > COMPACT_AFTER_DELETES:
+        _write_recipe_log(recipes)
+    return recipes
+
+
+def append_recipe(recipe):
+    """Save a new recipe by appending it to the log"""
+    if not os.path.exists(RECIPES_FILE):
+        load_recipes()  # Carry over any recipes from the old JSON file first
+    _append_records([recipe])
+
+
+def delete_recipe(recipes, idx):
+    """Remove a recipe from the list and queue the deletion for the next flush"""
+    recipe = recipes.pop(idx)
+    st.session_state.pending_deletes.append(recipe.get('created_at'))
+
+
+def flush_deletes(recipes):
+    """Write all queued deletions to disk in a single write"""
+    pending = st.session_state.pending_deletes
+    if not pending:
+        return
+    if None in pending:
+        # A recipe without an id can't be tombstoned, so rewrite the log from what is left
+        _write_recipe_log(recipes)
+    else:
+        _append_records([{'_deleted': created_at} for created_at in pending])
+    st.session_state.pending_deletes = []
+
+
+def _normalize_recipe(recipe):
+    """Map alternate recipe layouts (e.g. Guy's beer/malts/hops/statistics) onto the canonical keys"""
+    normalized = dict(recipe)
+    stats = recipe.get('statistics') or {}
+    
+    fallbacks = {
+        'name': recipe.get('beer'),
+        'batch_size': stats.get('volume'),
+        'brew_date': recipe.get('date'),
+        'og': stats.get('og'),
+        'fg': stats.get('fg'),
+        'abv': stats.get('abv'),
+        'ibu': stats.get('ibu'),
+    }
+    for key, fallback in fallbacks.items():
+        if not recipe.get(key) and fallback:
+            normalized[key] = fallback
+    normalized.setdefault('name', 'Unknown')
+    
+    normalized['grain_bill'] = [
+        {**grain, 'type': grain.get('type') or grain.get('name', 'Unknown'), 'weight': grain.get('weight', 0)}
+        for grain in recipe.get('grain_bill') or recipe.get('malts') or []
+    ]
+    normalized['hop_schedule'] = [
+        {**hop, 'variety': hop.get('variety') or hop.get('name', 'Unknown'), 'weight': hop.get('weight', 0),
+         'time': hop.get('time', hop.get('timing', 0))}
+        for hop in recipe.get('hop_schedule') or recipe.get('hops') or []
+    ]
+    return normalized
+
+
+@st.cache_resource(show_spinner=False)
+def _load_json(path, mtime):
+    """Parse and normalize a bundled recipe collection, cached until the file modification time changes.
+
+    Cached as a shared resource rather than copied per call, so callers must treat it as read-only.
+    """
+    with open(path, 'rb') as f:
+        return [_normalize_recipe(r) for r in _json_loads(f.read())]
+
+
+def load_recipe_collection(path):
+    """Load a bundled recipe collection, or None if the file is missing"""
+    if not os.path.exists(path):
+        return None
+    return _load_json(path, os.path.getmtime(path))
+
+
+@st.cache_data(show_spinner=False)
+def _collection_styles(path, mtime):
+    """Sorted unique beer styles in a bundled recipe collection"""
+    return sorted({r.get('style', 'Unknown') for r in _load_json(path, mtime)})
+
+
+@st.cache_resource(show_spinner=False)
+def _collection_indices(path, mtime):
+    """Style -> recipes index and pre-lowercased (name, recipe) pairs for filtering a collection (read-only)"""
+    recipes = _load_json(path, mtime)
+    by_style = {}
+    for r in recipes:
+        by_style.setdefault(r.get('style', 'Unknown'), []).append(r)
+    names = [(r['name'].lower(), r) for r in recipes]
+    return by_style, names
+
+
 def import_recipe_to_builder(recipe):
     """Import a recipe into the Recipe Builder for scaling"""
     # Clear existing data
@@ -79,23 +364,21 @@ def import_recipe_to_builder(recipe):
     st.session_state.import_other_ingredients = []
     
     # Import grain bill
-    if recipe.get('grain_bill'):
-        for grain in recipe['grain_bill']:
-            st.session_state.import_grain_bill.append({
-                'name': grain.get('type', grain.get('name', 'Unknown Grain')),
-                'original_amount': grain.get('weight', 0),
-                'scaled_amount': grain.get('weight', 0)
-            })
+    for grain in recipe['grain_bill']:
+        st.session_state.import_grain_bill.append({
+            'name': grain['type'],
+            'original_amount': grain['weight'],
+            'scaled_amount': grain['weight']
+        })
     
     # Import hop schedule
-    if recipe.get('hop_schedule'):
-        for hop in recipe['hop_schedule']:
-            st.session_state.import_hop_schedule.append({
-                'variety': hop.get('variety', 'Unknown Hop'),
-                'original_amount': hop.get('weight', 0),
-                'scaled_amount': hop.get('weight', 0),
-                'time': hop.get('time', 0)
-            })
+    for hop in recipe['hop_schedule']:
+        st.session_state.import_hop_schedule.append({
+            'variety': hop['variety'],
+            'original_amount': hop['weight'],
+            'scaled_amount': hop['weight'],
+            'time': hop['time']
+        })
     
     # Import other ingredients if present
     if recipe.get('other_ingredients'):
@@ -108,11 +391,9 @@ def import_recipe_to_builder(recipe):
             })
     
     # Store recipe metadata for pre-filling form fields
-    # Handle both standard and Guy's recipe formats
-    stats = recipe.get('statistics', {})
-    batch_size = recipe.get('batch_size') or stats.get('volume', 19.0)
-    og = recipe.get('og') or stats.get('og', 0)
-    fg = recipe.get('fg') or stats.get('fg', 0)
+    batch_size = recipe.get('batch_size') or 19.0
+    og = recipe.get('og') or 0
+    fg = recipe.get('fg') or 0
     
     # Handle yeast format (can be string or dict)
     yeast_data = recipe.get('yeast', '')
@@ -122,7 +403,7 @@ def import_recipe_to_builder(recipe):
         yeast_str = yeast_data if yeast_data else ''
     
     st.session_state.imported_recipe_data = {
-        'name': recipe.get('name') or recipe.get('beer', ''),
+        'name': recipe['name'],
         'style': recipe.get('style', ''),
         'batch_size': batch_size,
         'brewer': recipe.get('brewer', ''),
@@ -164,7 +445,7 @@ def export_recipe_to_csv(recipe):
         csv_data.append(["GRAIN BILL"])
         csv_data.append(["Grain Type", "Weight (kg)", "Lovibond"])
         for grain in recipe['grain_bill']:
-            csv_data.append([grain.get('type', grain.get('name', 'N/A')), 
+            csv_data.append([grain['type'], 
                            grain.get('weight', grain.get('scaled_amount', 'N/A')), 
                            grain.get('lovibond', '')])
         csv_data.append([])  # Empty row
@@ -215,13 +496,16 @@ def export_recipe_to_csv(recipe):
         csv_data.append(["NOTES"])
         csv_data.append([recipe['notes']])
     
-    # Convert to CSV string
+    # Convert to CSV string (csv.writer quotes cells containing commas, quotes or newlines)
     csv_buffer = io.StringIO()
-    for row in csv_data:
-        csv_buffer.write(','.join(str(cell) for cell in row) + '\n')
+    csv.writer(csv_buffer, lineterminator='\n').writerows(csv_data)
     return csv_buffer.getvalue()
 
 
+# Accepted answers to the entry gate riddle
+_CORRECT_ANSWERS = frozenset({"mellon"})
+
+
 def entry_gate():
     """Entry gate page with a question to verify user"""
     st.markdown("<div style='text-align: center; padding: 3rem 0;'>", unsafe_allow_html=True)
@@ -245,9 +529,9 @@ def entry_gate():
             submit_button = st.form_submit_button("Enter", type="primary", use_container_width=True)
             
             if submit_button:
-                correct_answers = ["mellon"]
-                if answer.lower().strip() in correct_answers:
+                if answer.lower().strip() in _CORRECT_ANSWERS:
                     st.session_state.entered_app = True
+                    st.query_params['entered'] = '1'  # Survive browser refreshes
                     st.rerun()
                 else:
                     st.error("❌ Incorrect answer.")
@@ -256,7 +540,12 @@ def entry_gate():
 
 
 def main():
-    # Check if user has entered the app
+    # Persist any deletions queued by callbacks before this rerun, in one write
+    flush_deletes(st.session_state.recipes)
+    
+    # Check if user has entered the app, either this session or before a refresh
+    if not st.session_state.entered_app and st.query_params.get('entered') == '1':
+        st.session_state.entered_app = True
     if not st.session_state.entered_app:
         entry_gate()
         return
@@ -271,10 +560,6 @@ def main():
         if 'page_selector' not in st.session_state:
             st.session_state.page_selector = "Home"
         
-        # Track previous page to detect navigation changes
-        if 'previous_page' not in st.session_state:
-            st.session_state.previous_page = "Home"
-        
         # Check if we need to navigate to a specific page programmatically
         if st.session_state.navigate_to_page:
             st.session_state.page_selector = st.session_state.navigate_to_page
@@ -288,19 +573,6 @@ def main():
         
         st.markdown("---")
     
-    # Scroll to top when page changes
-    if page != st.session_state.previous_page:
-        st.session_state.previous_page = page
-        # Use JavaScript to scroll to top
-        st.components.v1.html(
-            """
-            <script>
-                window.parent.document.querySelector('section.main').scrollTo(0, 0);
-            </script>
-            """,
-            height=0
-        )
-    
     if page == "Home":
         home_page()
     elif page == "Recipe Builder":
@@ -349,6 +621,78 @@ def home_page():
     st.markdown("</div>", unsafe_allow_html=True)
 
 
+@st.fragment
+def _grain_adder():
+    """Add-grain form; widget changes here only rerun this fragment"""
+    grains = st.session_state.grains
+    
+    with st.expander("Add Grain", expanded=True):
+        with st.form("grain_form"):
+            gcol1, gcol2, gcol3 = st.columns(3)
+            
+            with gcol1:
+                grain_idx = st.selectbox("Grain Type", range(len(_GRAIN_NAMES)),
+                                         format_func=_GRAIN_NAMES.__getitem__, key="grain_select")
+            
+            with gcol2:
+                grain_weight = st.number_input("Weight (kg)", min_value=0.0, max_value=22.0, value=0.5, step=0.1, key="grain_weight")
+            
+            with gcol3:
+                st.markdown("<div style='margin-top: 2rem;'></div>", unsafe_allow_html=True)
+                if st.form_submit_button("Add Grain"):
+                    grains['type'].append(_GRAIN_NAMES[grain_idx])
+                    grains['weight'] = np.append(grains['weight'], grain_weight)
+                    grains['ppg'] = np.append(grains['ppg'], _GRAIN_PPG[grain_idx])
+                    grains['lovibond'] = np.append(grains['lovibond'], _GRAIN_LOVIBOND[grain_idx])
+                    # Full app rerun so the grain table and statistics pick up the addition
+                    st.rerun()
+
+
+@st.fragment
+def _hop_adder():
+    """Add-hop form; widget changes here only rerun this fragment"""
+    hops = st.session_state.hops
+    
+    with st.expander("Add Hop Addition", expanded=True):
+        with st.form("hop_form"):
+            hcol1, hcol2, hcol3, hcol4 = st.columns(4)
+            
+            with hcol1:
+                hop_idx = st.selectbox("Hop Variety", range(len(_HOP_NAMES)),
+                                       format_func=_HOP_NAMES.__getitem__, key="hop_select")
+            
+            with hcol2:
+                hop_weight = st.number_input("Weight (g)", min_value=0.0, max_value=280.0, value=28.0, step=5.0, key="hop_weight")
+            
+            with hcol3:
+                hop_time = st.number_input("Boil Time (min)", min_value=0, max_value=90, value=60, step=5, key="hop_time")
+            
+            with hcol4:
+                st.markdown("<div style='margin-top: 2rem;'></div>", unsafe_allow_html=True)
+                if st.form_submit_button("Add Hop"):
+                    hops['variety'].append(_HOP_NAMES[hop_idx])
+                    hops['weight'] = np.append(hops['weight'], hop_weight)
+                    hops['time'] = np.append(hops['time'], hop_time)
+                    hops['alpha_acid'] = np.append(hops['alpha_acid'], _HOP_ALPHA[hop_idx])
+                    # Full app rerun so the hop table and statistics pick up the addition
+                    st.rerun()
+
+
+def _reset_state(**values):
+    """on_click callback: overwrite session-state entries before the rerun renders"""
+    for key, value in values.items():
+        st.session_state[key] = value
+
+
+def _drop_last(key):
+    """on_click callback: remove the last row from a list or column-dict entry"""
+    rows = st.session_state[key]
+    if isinstance(rows, dict):
+        st.session_state[key] = {k: v[:-1] for k, v in rows.items()}
+    elif rows:
+        rows.pop()
+
+
 def create_recipe_page():
     st.header("Create New Recipe")
     
@@ -366,7 +710,7 @@ def create_recipe_page():
     
     with col2:
         brewer = st.text_input("Brewer Name", placeholder="Your Name")
-        brew_date = st.date_input("Planned Brew Date", datetime.now())
+        brew_date = st.date_input("Planned Brew Date", st.session_state.brew_date_default)
         efficiency = st.slider("Expected Efficiency (%)", min_value=60, max_value=90, value=75)
     
     st.markdown("---")
@@ -374,109 +718,38 @@ def create_recipe_page():
     # Grain Bill Section
     st.subheader("🌾 Grain Bill")
     
-    grain_types = {
-        "2-Row Pale Malt": {"ppg": 37, "lovibond": 2},
-        "Pilsner Malt": {"ppg": 37, "lovibond": 1.5},
-        "Munich Malt": {"ppg": 35, "lovibond": 9},
-        "Vienna Malt": {"ppg": 36, "lovibond": 4},
-        "Crystal 40L": {"ppg": 34, "lovibond": 40},
-        "Crystal 60L": {"ppg": 34, "lovibond": 60},
-        "Chocolate Malt": {"ppg": 34, "lovibond": 350},
-        "Roasted Barley": {"ppg": 28, "lovibond": 500},
-        "Wheat Malt": {"ppg": 38, "lovibond": 2},
-        "Flaked Oats": {"ppg": 33, "lovibond": 1}
-    }
+    if 'grains' not in st.session_state:
+        st.session_state.grains = _empty_grains()
+    grains = st.session_state.grains
     
-    if 'grain_bill' not in st.session_state:
-        st.session_state.grain_bill = []
+    _grain_adder()
     
-    with st.expander("Add Grain", expanded=True):
-        gcol1, gcol2, gcol3 = st.columns(3)
-        
-        with gcol1:
-            grain_type = st.selectbox("Grain Type", list(grain_types.keys()), key="grain_select")
-        
-        with gcol2:
-            grain_weight = st.number_input("Weight (kg)", min_value=0.0, max_value=22.0, value=0.5, step=0.1, key="grain_weight")
+    if grains['type']:
+        st.dataframe({k: grains[k] for k in ('type', 'weight', 'lovibond')}, use_container_width=True)
         
-        with gcol3:
-            st.markdown("<div style='margin-top: 2rem;'></div>", unsafe_allow_html=True)
-            if st.button("Add Grain"):
-                grain_info = grain_types[grain_type]
-                st.session_state.grain_bill.append({
-                    'type': grain_type,
-                    'weight': grain_weight,
-                    'ppg': grain_info['ppg'],
-                    'lovibond': grain_info['lovibond']
-                })
-                st.rerun()
-    
-    if st.session_state.grain_bill:
-        grain_df = pd.DataFrame(st.session_state.grain_bill)
-        st.dataframe(grain_df[['type', 'weight', 'lovibond']], use_container_width=True)
-        
-        if st.button("Clear Grain Bill"):
-            st.session_state.grain_bill = []
-            st.rerun()
+        st.button("Clear Grain Bill", on_click=_reset_state, kwargs={'grains': _empty_grains()})
     
     st.markdown("---")
     
     # Hop Schedule Section
     st.subheader("🌿 Hop Schedule")
     
-    hop_varieties = {
-        "Cascade": 5.5,
-        "Centennial": 10.0,
-        "Chinook": 13.0,
-        "Citra": 12.0,
-        "Mosaic": 12.5,
-        "Amarillo": 9.0,
-        "Simcoe": 13.0,
-        "Columbus": 15.0,
-        "Hallertau": 4.0,
-        "Saaz": 3.5
-    }
+    if 'hops' not in st.session_state:
+        st.session_state.hops = _empty_hops()
+    hops = st.session_state.hops
     
-    if 'hop_schedule' not in st.session_state:
-        st.session_state.hop_schedule = []
+    _hop_adder()
     
-    with st.expander("Add Hop Addition", expanded=True):
-        hcol1, hcol2, hcol3, hcol4 = st.columns(4)
-        
-        with hcol1:
-            hop_variety = st.selectbox("Hop Variety", list(hop_varieties.keys()), key="hop_select")
-        
-        with hcol2:
-            hop_weight = st.number_input("Weight (g)", min_value=0.0, max_value=280.0, value=28.0, step=5.0, key="hop_weight")
-        
-        with hcol3:
-            hop_time = st.number_input("Boil Time (min)", min_value=0, max_value=90, value=60, step=5, key="hop_time")
-        
-        with hcol4:
-            st.markdown("<div style='margin-top: 2rem;'></div>", unsafe_allow_html=True)
-            if st.button("Add Hop"):
-                st.session_state.hop_schedule.append({
-                    'variety': hop_variety,
-                    'weight': hop_weight,
-                    'time': hop_time,
-                    'alpha_acid': hop_varieties[hop_variety]
-                })
-                st.rerun()
-    
-    if st.session_state.hop_schedule:
-        hop_df = pd.DataFrame(st.session_state.hop_schedule)
-        st.dataframe(hop_df[['variety', 'weight', 'time', 'alpha_acid']], use_container_width=True)
+    if hops['variety']:
+        st.dataframe(hops, use_container_width=True)
         
         hbtn1, hbtn2 = st.columns(2)
         with hbtn1:
-            if st.button("Remove Last Hop", disabled=len(st.session_state.hop_schedule) == 0):
-                if st.session_state.hop_schedule:
-                    st.session_state.hop_schedule.pop()
-                    st.rerun()
+            st.button("Remove Last Hop", disabled=len(hops['variety']) == 0,
+                      on_click=_drop_last, args=('hops',))
         with hbtn2:
-            if st.button("Clear Hop Schedule", disabled=len(st.session_state.hop_schedule) == 0):
-                st.session_state.hop_schedule = []
-                st.rerun()
+            st.button("Clear Hop Schedule", disabled=len(hops['variety']) == 0,
+                      on_click=_reset_state, kwargs={'hops': _empty_hops()})
     else:
         st.info("No hops added yet. Add your first hop above.")
     
@@ -485,21 +758,10 @@ def create_recipe_page():
     # Yeast Section
     st.subheader("🧫 Yeast")
     
-    yeast_strains = [
-        "US-05 (American Ale)",
-        "S-04 (English Ale)",
-        "WLP001 (California Ale)",
-        "WLP002 (English Ale)",
-        "WLP007 (Dry English Ale)",
-        "Safale S-33 (General Purpose)",
-        "Wyeast 1056 (American Ale)",
-        "Wyeast 1968 (London ESB)"
-    ]
-    
     ycol1, ycol2 = st.columns(2)
     
     with ycol1:
-        yeast = st.selectbox("Yeast Strain", yeast_strains)
+        yeast = st.selectbox("Yeast Strain", _YEAST_STRAINS)
     
     with ycol2:
         fermentation_temp = st.slider("Fermentation Temperature (°C)", min_value=15, max_value=24, value=20)
@@ -526,17 +788,16 @@ def create_recipe_page():
     st.markdown("---")
     
     # Recipe Calculations
-    if st.session_state.grain_bill:
+    if grains['type']:
         st.subheader("📊 Recipe Statistics")
         
-        og = calculate_og(st.session_state.grain_bill, batch_size)
-        srm = calculate_srm(st.session_state.grain_bill, batch_size)
+        og, srm = _og_srm_cached(grains['weight'], grains['ppg'], grains['lovibond'], batch_size)
         
         fg = st.number_input("Expected Final Gravity", min_value=1.000, max_value=1.030, value=1.010, step=0.001)
         abv = calculate_abv(og, fg)
         
-        if st.session_state.hop_schedule:
-            ibu = calculate_ibu(st.session_state.hop_schedule, og, batch_size)
+        if hops['variety']:
+            ibu = _ibu_cached(hops['alpha_acid'], hops['weight'], hops['time'], og, batch_size)
         else:
             ibu = 0
         
@@ -569,7 +830,7 @@ def create_recipe_page():
     if st.button("💾 Save Recipe", type="primary"):
         if not recipe_name:
             st.error("Please enter a recipe name")
-        elif not st.session_state.grain_bill:
+        elif not grains['type']:
             st.error("Please add at least one grain to the grain bill")
         else:
             recipe = {
@@ -579,18 +840,18 @@ def create_recipe_page():
                 'batch_size': batch_size,
                 'efficiency': efficiency,
                 'brew_date': brew_date.strftime('%d/%m/%Y'),
-                'grain_bill': st.session_state.grain_bill,
-                'hop_schedule': st.session_state.hop_schedule,
+                'grain_bill': _to_records(grains),
+                'hop_schedule': _to_records(hops),
                 'yeast': yeast,
                 'fermentation_temp': fermentation_temp,
                 'mash_volume': mash_volume,
                 'sparge_volume': sparge_volume,
                 'final_volume': final_volume,
-                'og': og if st.session_state.grain_bill else 0,
+                'og': og if grains['type'] else 0,
                 'fg': fg,
-                'abv': abv if st.session_state.grain_bill else 0,
-                'ibu': ibu if st.session_state.hop_schedule else 0,
-                'srm': srm if st.session_state.grain_bill else 0,
+                'abv': abv if grains['type'] else 0,
+                'ibu': ibu if hops['variety'] else 0,
+                'srm': srm if grains['type'] else 0,
                 'notes': notes,
                 'created_at': datetime.now().isoformat()
             }
@@ -598,15 +859,37 @@ def create_recipe_page():
             st.session_state.recipes.append(recipe)
             
             # Save to file
-            os.makedirs('data/recipes', exist_ok=True)
-            with open('data/recipes/recipes.json', 'w') as f:
-                json.dump(st.session_state.recipes, f, indent=2)
+            append_recipe(recipe)
             
             st.success(f"✅ Recipe '{recipe_name}' saved successfully!")
             
             # Clear form
-            st.session_state.grain_bill = []
-            st.session_state.hop_schedule = []
+            st.session_state.grains = _empty_grains()
+            st.session_state.hops = _empty_hops()
+
+
+def _fmt1(value, default="N/A"):
+    """Format a number to one decimal place, passing anything else through as text"""
+    if type(value) is float or type(value) is int:
+        return f"{value:.1f}"
+    return str(value) if value else default
+
+
+def _md_table(headers, rows):
+    """Render a small table as markdown, avoiding a dataframe widget per table"""
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines.extend("| " + " | ".join(str(cell).replace('|', '\\|') for cell in row) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=4096)
+def _slug(name):
+    """Filename-friendly form of a recipe name"""
+    return name.replace(' ', '_').lower()
+
+
+# Forum search results are shown this many cards at a time
+FORUM_PAGE_SIZE = 20
 
 
 def view_recipes_page():
@@ -621,11 +904,11 @@ def view_recipes_page():
     
     st.markdown("---")
     
+    page_start = 0
     if recipe_view == "My Recipes":
         # Load user recipes from file if exists
-        if os.path.exists('data/recipes/recipes.json') and not st.session_state.recipes:
-            with open('data/recipes/recipes.json', 'r') as f:
-                st.session_state.recipes = json.load(f)
+        if not st.session_state.recipes:
+            st.session_state.recipes = load_recipes()
         
         if not st.session_state.recipes:
             st.info("No recipes saved yet. Create your first recipe in the Recipe Builder!")
@@ -635,10 +918,8 @@ def view_recipes_page():
         is_user_recipes = True
     elif recipe_view == "Forum Recipes":
         # Load precompiled recipes
-        if os.path.exists('data/recipes/precompiled_recipes.json'):
-            with open('data/recipes/precompiled_recipes.json', 'r') as f:
-                all_forum_recipes = json.load(f)
-        else:
+        forum_path = 'data/recipes/precompiled_recipes.json'
+        if not os.path.exists(forum_path):
             st.error("Precompiled recipes file not found!")
             return
         is_user_recipes = False
@@ -647,7 +928,7 @@ def view_recipes_page():
         st.subheader("🔍 Search Forum Recipes")
         
         # Extract unique styles
-        unique_styles = sorted(list(set(r.get('style', 'Unknown') for r in all_forum_recipes)))
+        unique_styles = _collection_styles(forum_path, os.path.getmtime(forum_path))
         
         # Search options
         search_col1, search_col2 = st.columns(2)
@@ -662,24 +943,44 @@ def view_recipes_page():
                 recipe_name_search = st.text_input("Enter recipe name", placeholder="e.g., IPA, Stout, Pale Ale", key="forum_name_search")
         
         # Filter recipes based on search
+        by_style, names = _collection_indices(forum_path, os.path.getmtime(forum_path))
         if search_by == "Style" and selected_style:
-            recipes_to_display = [r for r in all_forum_recipes if r.get('style') == selected_style]
+            recipes_to_display = by_style.get(selected_style, [])
             st.info(f"Found **{len(recipes_to_display)}** recipes in style: **{selected_style}**")
         elif search_by == "Recipe Name" and recipe_name_search:
             search_term = recipe_name_search.lower()
-            recipes_to_display = [r for r in all_forum_recipes if search_term in r.get('name', '').lower()]
+            recipes_to_display = [r for name, r in names if search_term in name]
             st.info(f"Found **{len(recipes_to_display)}** recipes matching: **{recipe_name_search}**")
         else:
             recipes_to_display = []
             st.info("👆 Select a style or enter a recipe name to view recipes")
         
+        # Paginate so a popular style only renders one page of cards per rerun
+        forum_filter = (search_by, selected_style if search_by == "Style" else recipe_name_search)
+        if st.session_state.get('forum_filter') != forum_filter:
+            st.session_state.forum_filter = forum_filter
+            st.session_state.forum_page = 0
+        page_count = max(1, -(-len(recipes_to_display) // FORUM_PAGE_SIZE))
+        page_num = min(st.session_state.forum_page, page_count - 1)
+        page_start = page_num * FORUM_PAGE_SIZE
+        recipes_to_display = recipes_to_display[page_start:page_start + FORUM_PAGE_SIZE]
+        
+        if page_count > 1:
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                st.button("◀ Previous", disabled=page_num == 0,
+                          on_click=_reset_state, kwargs={'forum_page': page_num - 1})
+            with page_col:
+                st.markdown(f"Page {page_num + 1} of {page_count}")
+            with next_col:
+                st.button("Next ▶", disabled=page_num == page_count - 1,
+                          on_click=_reset_state, kwargs={'forum_page': page_num + 1})
+        
         st.markdown("---")
     elif recipe_view == "Guy's Recipes":
         # Load Guy's recipes
-        if os.path.exists('data/recipes/guys.json'):
-            with open('data/recipes/guys.json', 'r') as f:
-                guys_recipes = json.load(f)
-        else:
+        guys_recipes = load_recipe_collection('data/recipes/guys.json')
+        if guys_recipes is None:
             st.error("Guy's recipes file not found!")
             return
         
@@ -690,10 +991,8 @@ def view_recipes_page():
         st.markdown("---")
     else:  # Mathieu's Recipes
         # Load Mathieu's recipes
-        if os.path.exists('data/recipes/mathieu.json'):
-            with open('data/recipes/mathieu.json', 'r') as f:
-                mathieu_recipes = json.load(f)
-        else:
+        mathieu_recipes = load_recipe_collection('data/recipes/mathieu.json')
+        if mathieu_recipes is None:
             st.error("Mathieu's recipes file not found!")
             return
         
@@ -704,12 +1003,21 @@ def view_recipes_page():
         st.markdown("---")
     
     # Display recipes as cards (only if there are recipes to display)
-    for idx, recipe in enumerate(recipes_to_display):
+    open_card = st.session_state.get('open_card')
+    for idx, recipe in enumerate(recipes_to_display, start=page_start):
         # Handle different recipe structures
-        recipe_name = recipe.get('name') or recipe.get('beer', 'Unknown')
+        recipe_name = recipe['name']
         recipe_style = recipe.get('style', 'N/A')
-        
-        with st.expander(f"🍺 {recipe_name} - {recipe_style}", expanded=False):
+        card_key = (recipe_view, idx)
+        is_open = open_card == card_key
+        
+        with st.expander(f"🍺 {recipe_name} - {recipe_style}", expanded=is_open):
+            # Expander bodies run even when collapsed, so only the open card builds its tables
+            if not is_open:
+                st.button("Show details", key=f"open_{idx}", on_click=_reset_state, kwargs={'open_card': card_key})
+                continue
+            st.button("Hide details", key=f"close_{idx}", on_click=_reset_state, kwargs={'open_card': None})
+            
             col1, col2 = st.columns(2)
             
             with col1:
@@ -722,12 +1030,12 @@ def view_recipes_page():
                     st.markdown(f"**Recipe Source:** {recipe.get('recipe_source')}")
                     
                 # Batch size
-                batch_size = recipe.get('batch_size') or recipe.get('statistics', {}).get('volume')
+                batch_size = recipe.get('batch_size')
                 if batch_size:
                     st.markdown(f"**Batch Size:** {batch_size} litres")
                     
                 # Brew date
-                brew_date = recipe.get('brew_date') or recipe.get('date')
+                brew_date = recipe.get('brew_date')
                 if brew_date:
                     st.markdown(f"**Brew Date:** {brew_date}")
                     
@@ -741,11 +1049,10 @@ def view_recipes_page():
             
             with col2:
                 # Statistics
-                stats = recipe.get('statistics', {})
-                og = recipe.get('og') or stats.get('og')
-                fg = recipe.get('fg') or stats.get('fg')
-                abv = recipe.get('abv') or stats.get('abv')
-                ibu = recipe.get('ibu') or stats.get('ibu')
+                og = recipe.get('og')
+                fg = recipe.get('fg')
+                abv = recipe.get('abv')
+                ibu = recipe.get('ibu')
                 
                 if og:
                     st.markdown(f"**OG:** {og}")
@@ -756,162 +1063,114 @@ def view_recipes_page():
                 if ibu:
                     st.markdown(f"**IBU:** {ibu}")
             
-            # Grain Bill - handle both formats
-            grain_bill = recipe.get('grain_bill') or recipe.get('malts')
-            if grain_bill:
+            # Grain Bill
+            if recipe['grain_bill']:
                 st.markdown("**Grain Bill:**")
-                grain_data = []
-                for grain in grain_bill:
-                    grain_type = grain.get('type') or grain.get('name', 'Unknown')
-                    grain_weight = grain.get('weight', 0)
-                    grain_data.append({'Grain Type': grain_type, 'Weight (kg)': grain_weight})
-                grain_df = pd.DataFrame(grain_data)
-                st.dataframe(grain_df, use_container_width=True, hide_index=True)
+                grain_data = [{'Grain Type': g['type'], 'Weight (kg)': g['weight']} for g in recipe['grain_bill']]
+                st.dataframe(grain_data, use_container_width=True, hide_index=True)
             
-            # Hop Schedule - handle both formats
-            hop_schedule = recipe.get('hop_schedule') or recipe.get('hops')
-            if hop_schedule:
+            # Hop Schedule
+            if recipe['hop_schedule']:
                 st.markdown("**Hop Schedule:**")
-                hop_data = []
-                for hop in hop_schedule:
-                    variety = hop.get('variety') or hop.get('name', 'Unknown')
-                    weight = hop.get('weight', 0)
-                    time = hop.get('time') or hop.get('timing', 'N/A')
-                    hop_data.append({'Variety': variety, 'Weight (g)': weight, 'Time (min)': time})
-                hop_df = pd.DataFrame(hop_data)
-                st.dataframe(hop_df, use_container_width=True, hide_index=True)
+                hop_data = [{'Variety': h['variety'], 'Weight (g)': h['weight'], 'Time (min)': h['time']}
+                            for h in recipe['hop_schedule']]
+                st.dataframe(hop_data, use_container_width=True, hide_index=True)
             
             # Water Volumes Table
-            if recipe.get('mash_volume') or recipe.get('sparge_volume') or recipe.get('pre_boil_volume') or recipe.get('final_volume'):
+            # Built column-wise so st.dataframe takes the fast dict-of-lists path
+            water_params, water_vols = [], []
+            for label, key in (("Mash Volume", 'mash_volume'), ("Sparge Volume", 'sparge_volume'),
+                               ("Pre-boil Volume", 'pre_boil_volume'), ("Final Volume", 'final_volume')):
+                vol = recipe.get(key)
+                if vol:
+                    water_params.append(label)
+                    water_vols.append(_fmt1(vol))
+            if water_params:
                 st.markdown("**Water Volumes:**")
-                water_data = []
-                if recipe.get('mash_volume'):
-                    mash_vol = recipe.get('mash_volume')
-                    water_data.append({"Parameter": "Mash Volume", "Volume (L)": f"{mash_vol:.1f}" if isinstance(mash_vol, (int, float)) else str(mash_vol)})
-                if recipe.get('sparge_volume'):
-                    sparge_vol = recipe.get('sparge_volume')
-                    water_data.append({"Parameter": "Sparge Volume", "Volume (L)": f"{sparge_vol:.1f}" if isinstance(sparge_vol, (int, float)) else str(sparge_vol)})
-                if recipe.get('pre_boil_volume'):
-                    pre_boil_vol = recipe.get('pre_boil_volume')
-                    water_data.append({"Parameter": "Pre-boil Volume", "Volume (L)": f"{pre_boil_vol:.1f}" if isinstance(pre_boil_vol, (int, float)) else str(pre_boil_vol)})
-                if recipe.get('final_volume'):
-                    final_vol = recipe.get('final_volume')
-                    water_data.append({"Parameter": "Final Volume", "Volume (L)": f"{final_vol:.1f}" if isinstance(final_vol, (int, float)) else str(final_vol)})
-                if water_data:
-                    water_df = pd.DataFrame(water_data)
-                    st.dataframe(water_df, use_container_width=True, hide_index=True)
+                st.markdown(_md_table(("Parameter", "Volume (L)"), zip(water_params, water_vols)))
             
             # Protocol (Mash & Boil) - handle Guy's format
             protocol = recipe.get('protocol', {})
-            if protocol or recipe.get('mash_temp') or recipe.get('mash_time') or recipe.get('boil_temp') or recipe.get('boil_time'):
+            mash_temp, mash_time = recipe.get('mash_temp'), recipe.get('mash_time')
+            boil_temp, boil_time = recipe.get('boil_temp'), recipe.get('boil_time')
+            if protocol or mash_temp or mash_time or boil_temp or boil_time:
                 st.markdown("**Protocol:**")
-                protocol_data = []
+                steps, step_temps, step_times = [], [], []
                 
                 # From Guy's format
                 if protocol:
                     for step_name, step_data in protocol.items():
                         if isinstance(step_data, dict):
-                            temp = step_data.get('temperature', 'N/A')
-                            time = step_data.get('time', 'N/A')
-                            protocol_data.append({
-                                "Step": step_name.title(),
-                                "Temperature (°C)": str(temp),
-                                "Time (min)": str(time)
-                            })
+                            steps.append(step_name.title())
+                            step_temps.append(str(step_data.get('temperature', 'N/A')))
+                            step_times.append(str(step_data.get('time', 'N/A')))
                 # From standard format
                 else:
-                    mash_temp = recipe.get('mash_temp')
-                    mash_time = recipe.get('mash_time')
                     if mash_temp or mash_time:
-                        mash_temp_str = f"{mash_temp:.1f}" if isinstance(mash_temp, (int, float)) else (str(mash_temp) if mash_temp else "N/A")
+                        mash_temp_str = _fmt1(mash_temp)
                         mash_time_str = str(mash_time) if mash_time else "N/A"
-                        protocol_data.append({"Step": "Mash", "Temperature (°C)": mash_temp_str, "Time (min)": mash_time_str})
+                        steps.append("Mash")
+                        step_temps.append(mash_temp_str)
+                        step_times.append(mash_time_str)
                     
-                    boil_temp = recipe.get('boil_temp')
-                    boil_time = recipe.get('boil_time')
                     if boil_temp or boil_time:
-                        boil_temp_str = f"{boil_temp:.1f}" if isinstance(boil_temp, (int, float)) else (str(boil_temp) if boil_temp else "N/A")
+                        boil_temp_str = _fmt1(boil_temp)
                         boil_time_str = str(boil_time) if boil_time else "N/A"
-                        protocol_data.append({"Step": "Boil", "Temperature (°C)": boil_temp_str, "Time (min)": boil_time_str})
+                        steps.append("Boil")
+                        step_temps.append(boil_temp_str)
+                        step_times.append(boil_time_str)
                 
-                if protocol_data:
-                    protocol_df = pd.DataFrame(protocol_data)
-                    st.dataframe(protocol_df, use_container_width=True, hide_index=True)
+                if steps:
+                    st.markdown(_md_table(("Step", "Temperature (°C)", "Time (min)"), zip(steps, step_temps, step_times)))
             
             # Fermentation - handle both formats
             fermentation = recipe.get('fermentation', [])
-            if fermentation or recipe.get('fermentation_temp') or recipe.get('fermentation_days'):
+            ferm_temp, ferm_days = recipe.get('fermentation_temp'), recipe.get('fermentation_days')
+            if fermentation or ferm_temp or ferm_days:
                 st.markdown("**Fermentation:**")
                 
                 # From Guy's format (list of stages)
                 if isinstance(fermentation, list) and fermentation:
-                    ferm_data = []
-                    for stage in fermentation:
-                        stage_name = stage.get('stage', 'Unknown')
-                        stage_time = stage.get('time', 'N/A')
-                        stage_temp = stage.get('temperature', 'N/A')
-                        ferm_data.append({
-                            "Stage": stage_name,
-                            "Time": str(stage_time),
-                            "Temperature (°C)": str(stage_temp)
-                        })
-                    ferm_df = pd.DataFrame(ferm_data)
-                    st.dataframe(ferm_df, use_container_width=True, hide_index=True)
+                    ferm_rows = [(stage.get('stage', 'Unknown'), stage.get('time', 'N/A'), stage.get('temperature', 'N/A'))
+                                 for stage in fermentation]
+                    st.markdown(_md_table(("Stage", "Time", "Temperature (°C)"), ferm_rows))
                 # From standard format
                 else:
-                    ferm_temp = recipe.get('fermentation_temp')
-                    ferm_days = recipe.get('fermentation_days')
-                    ferm_temp_str = f"{ferm_temp:.1f}" if isinstance(ferm_temp, (int, float)) else (str(ferm_temp) if ferm_temp else "N/A")
+                    ferm_temp_str = _fmt1(ferm_temp)
                     ferm_days_str = str(ferm_days) if ferm_days else "N/A"
-                    
-                    fermentation_data = [{"Temperature (°C)": ferm_temp_str, "Duration (days)": ferm_days_str}]
-                    fermentation_df = pd.DataFrame(fermentation_data)
-                    st.dataframe(fermentation_df, use_container_width=True, hide_index=True)
+                    st.markdown(_md_table(("Temperature (°C)", "Duration (days)"), [(ferm_temp_str, ferm_days_str)]))
             
-            if recipe.get('notes'):
-                st.markdown(f"**Notes:** {recipe['notes']}")
+            notes = recipe.get('notes')
+            if notes:
+                st.markdown(f"**Notes:** {notes}")
             
             st.markdown("---")
             
-            # Action buttons
-            if is_user_recipes:
-                btn_col1, btn_col2 = st.columns(2)
-                
-                with btn_col1:
-                    csv_string = export_recipe_to_csv(recipe)
-                    st.download_button(
-                        label="📥 Export as CSV",
-                        data=csv_string,
-                        file_name=f"{recipe['name'].replace(' ', '_').lower()}.csv",
-                        mime="text/csv",
-                        key=f"export_{idx}"
-                    )
-                
-                with btn_col2:
-                    if st.button(f"🗑️ Delete Recipe", key=f"delete_{idx}"):
-                        st.session_state.recipes.pop(idx)
-                        with open('data/recipes/recipes.json', 'w') as f:
-                            json.dump(st.session_state.recipes, f, indent=2)
-                        st.rerun()
-            else:
-                # For precompiled recipes, show export and import buttons
-                btn_col1, btn_col2 = st.columns(2)
-                
-                with btn_col1:
-                    csv_string = export_recipe_to_csv(recipe)
-                    st.download_button(
-                        label="📥 Export as CSV",
-                        data=csv_string,
-                        file_name=f"{recipe['name'].replace(' ', '_').lower()}.csv",
-                        mime="text/csv",
-                        key=f"export_{idx}"
-                    )
-                
-                with btn_col2:
-                    if st.button(f"📋 Import to Recipe Builder", key=f"import_{idx}"):
-                        import_recipe_to_builder(recipe)
-                        st.session_state.navigate_to_page = "Recipe Builder"
-                        st.rerun()
+            # Action buttons: every card can be exported, then delete for user recipes or import for the rest
+            btn_col1, btn_col2 = st.columns(2)
+            
+            with btn_col1:
+                st.download_button(
+                    label="📥 Export as CSV",
+                    data=export_recipe_to_csv(recipe),
+                    file_name=f"{_slug(recipe['name'])}.csv",
+                    mime="text/csv",
+                    key=f"export_{idx}"
+                )
+            
+            with btn_col2:
+                if is_user_recipes:
+                    st.button(f"🗑️ Delete Recipe", key=f"delete_{idx}",
+                              on_click=delete_recipe, args=(st.session_state.recipes, idx))
+                else:
+                    st.button(f"📋 Import to Recipe Builder", key=f"import_{idx}",
+                              on_click=_import_and_open_builder, args=(recipe,))
+
+
+def _import_and_open_builder(recipe):
+    """on_click callback: load a recipe into the builder and switch to it"""
+    import_recipe_to_builder(recipe)
+    st.session_state.navigate_to_page = "Recipe Builder"
 
 
 def calculator_page():
@@ -948,22 +1207,18 @@ def calculator_page():
         with col2:
             co2_level = st.number_input("Desired CO2 Volumes", min_value=1.5, max_value=4.5, value=2.5, step=0.1,
                                        help="Typical: Lager 2.5, Ale 2.0-2.5, Wheat 3.0-4.0")
-            sugar_type = st.selectbox("Sugar Type", ["Corn Sugar (Dextrose)", "Table Sugar (Sucrose)"])
+            sugar_type = st.selectbox("Sugar Type", tuple(_SUGAR_FACTORS))
         
         # Calculate dissolved CO2 already in beer based on temperature (Celsius)
         # Polynomial approximation for CO2 solubility in beer (gives 0.86 at 20°C)
-        dissolved_co2 = -0.000316 * (beer_temp ** 2) + 0.0052 * beer_temp + 0.876
+        # Evaluated in Horner form: -0.000316*T^2 + 0.0052*T + 0.876
+        dissolved_co2 = (-0.000316 * beer_temp + 0.0052) * beer_temp + 0.876
         
         # Calculate additional CO2 needed
         co2_needed = co2_level - dissolved_co2
         
         # Calculate sugar needed based on type
-        # Corn sugar: 4.39g per litre to produce 1 volume of CO2 (accounting for 91% fermentability)
-        # Table sugar: 4.0g per litre to produce 1 volume of CO2 (100% fermentable)
-        if sugar_type == "Corn Sugar (Dextrose)":
-            sugar_g = volume * co2_needed * 4.39
-        else:  # Table sugar
-            sugar_g = volume * co2_needed * 4.0
+        sugar_g = volume * co2_needed * _SUGAR_FACTORS[sugar_type]
         
         st.success(f"**{sugar_type}** Needed: **{sugar_g:.1f} g**")
         
@@ -978,31 +1233,7 @@ def calculator_page():
         st.markdown("---")
         st.markdown("### Carbonation Guidelines by Style")
         
-        guidelines_data = {
-            "Style": [
-                "British Style Ales",
-                "Belgian Ales",
-                "American Ales and Lager",
-                "Fruit Lambic",
-                "Porter, Stout",
-                "European Lagers",
-                "Lambic",
-                "German Wheat Beer"
-            ],
-            "CO2 Volumes": [
-                "1.5 - 2.0",
-                "1.9 - 2.4",
-                "2.2 - 2.7",
-                "3.0 - 4.5",
-                "1.7 - 2.3",
-                "2.2 - 2.7",
-                "2.4 - 2.8",
-                "3.3 - 4.5"
-            ]
-        }
-        
-        guidelines_df = pd.DataFrame(guidelines_data)
-        st.dataframe(guidelines_df, use_container_width=True, hide_index=True)
+        st.dataframe(_CARBONATION_GUIDELINES, use_container_width=True, hide_index=True)
     
     elif calc_type == "Gravity Temperature Correction":
         st.subheader("Gravity Temperature Correction")
@@ -1037,6 +1268,44 @@ def calculator_page():
             st.info("📊 Sample is at calibration temperature. No correction needed.")
 
 
+def _add_import_grain(scale_factor):
+    """on_click callback: append the grain entered in the scaler form"""
+    name = st.session_state.import_grain_name
+    if name:
+        amount = st.session_state.import_grain_amount
+        st.session_state.import_grain_bill.append({
+            'name': name,
+            'original_amount': amount,
+            'scaled_amount': round(amount * scale_factor, 2)
+        })
+
+
+def _add_import_hop(scale_factor):
+    """on_click callback: append the hop addition entered in the scaler form"""
+    name = st.session_state.import_hop_name
+    if name:
+        amount = st.session_state.import_hop_amount
+        st.session_state.import_hop_schedule.append({
+            'variety': name,
+            'original_amount': amount,
+            'scaled_amount': round(amount * scale_factor, 1),
+            'time': st.session_state.import_hop_time
+        })
+
+
+def _add_import_other():
+    """on_click callback: append the extra ingredient entered in the scaler form"""
+    name = st.session_state.import_other_name
+    if name:
+        unit = st.session_state.import_other_unit
+        st.session_state.import_other_ingredients.append({
+            'name': name,
+            'original_amount': st.session_state.import_other_amount,
+            'unit': unit,
+            'should_scale': st.session_state.import_other_scale and unit in ["g", "kg", "ml", "L"]
+        })
+
+
 def recipe_scaler_page():
     # Initialise session state for scaled recipe
     if 'scaled_recipe' not in st.session_state:
@@ -1049,6 +1318,19 @@ def recipe_scaler_page():
     # Check for imported recipe data to pre-fill form
     imported_data = st.session_state.get('imported_recipe_data', {})
     
+    # Typed widget defaults, taken from the imported recipe when it has a value
+    default_batch_size = float(imported_data.get('batch_size') or 19.0)
+    default_og = float(imported_data.get('og') or 1.050)
+    default_fg = float(imported_data.get('fg') or 1.010)
+    default_mash_temp = float(imported_data.get('mash_temp') or 67.0)
+    default_mash_time = int(imported_data.get('mash_time') or 60)
+    default_boil_temp = float(imported_data.get('boil_temp') or 100.0)
+    default_boil_time = int(imported_data.get('boil_time') or 60)
+    default_yeast = imported_data.get('yeast') or ''
+    default_ferm_temp = float(imported_data.get('fermentation_temp') or 20.0)
+    default_ferm_days = int(imported_data.get('fermentation_days') or 14)
+    default_notes = imported_data.get('notes') or ''
+    
     with col1:
         recipe_name_import = st.text_input("Recipe Name", placeholder="e.g., Clone IPA", 
                                           value=imported_data.get('name', ''))
@@ -1062,7 +1344,7 @@ def recipe_scaler_page():
                                           value=imported_data.get('brewer', ''))
 
     with col4:
-        planned_brew_date = st.date_input("Planned Brew Date", datetime.now(), key="import_brew_date")
+        planned_brew_date = st.date_input("Planned Brew Date", st.session_state.brew_date_default, key="import_brew_date")
 
     st.markdown("---")
 
@@ -1070,16 +1352,14 @@ def recipe_scaler_page():
 
     col1, col2 = st.columns(2)
     
-    # Use imported batch size if available
-    default_batch_size = imported_data.get('batch_size', 19.0)
 
     with col1:
         original_batch_size = st.number_input("Original Batch Size (litres)", min_value=1.0, max_value=500.0, 
-                                             value=float(default_batch_size), step=1.0)
+                                             value=default_batch_size, step=1.0)
      
     with col2:
         target_batch_size = st.number_input("Target Batch Size (litres)", min_value=1.0, max_value=500.0, 
-                                           value=float(default_batch_size), step=1.0)
+                                           value=default_batch_size, step=1.0)
     
     # Calculate scaling factor
     if original_batch_size > 0:
@@ -1098,53 +1378,38 @@ def recipe_scaler_page():
     if 'import_grain_bill' not in st.session_state:
         st.session_state.import_grain_bill = []
     
-    with st.expander("Add Grain", expanded=True):
+    # Forms keep typing in the editors from rerunning the page until a button is pressed
+    with st.expander("Add Grain", expanded=True), st.form("import_grain_form", border=False):
         gcol1, gcol2, gcol3, gcol4 = st.columns([2, 1, 1, 1])
         
         with gcol1:
-            grain_name = st.text_input("Grain Name", placeholder="e.g., Pale Malt", key="import_grain_name")
+            st.text_input("Grain Name", placeholder="e.g., Pale Malt", key="import_grain_name")
         
         with gcol2:
-            grain_amount = st.number_input("Amount (kg)", min_value=0.0, max_value=100.0, value=1.0, step=0.1, key="import_grain_amount")
+            st.number_input("Amount (kg)", min_value=0.0, max_value=100.0, value=1.0, step=0.1, key="import_grain_amount")
         
         with gcol3:
             st.write("")
             st.write("")
-            if st.button("Add Grain", key="add_import_grain"):
-                if grain_name:
-                    scaled_amount = grain_amount * scale_factor
-                    st.session_state.import_grain_bill.append({
-                        'name': grain_name,
-                        'original_amount': grain_amount,
-                        'scaled_amount': round(scaled_amount, 2)
-                    })
-                    st.rerun()
+            st.form_submit_button("Add Grain", on_click=_add_import_grain, args=(scale_factor,))
         
         with gcol4:
             st.write("")
             st.write("")
-            if st.button("Remove Last", key="remove_last_grain"):
-                if st.session_state.import_grain_bill:
-                    st.session_state.import_grain_bill.pop()
-                    st.rerun()
+            st.form_submit_button("Remove Last", on_click=_drop_last, args=('import_grain_bill',))
     
     if st.session_state.import_grain_bill:
         st.markdown("**Grain Bill:**")
-        grain_data = []
-        for grain in st.session_state.import_grain_bill:
-            # Recalculate scaled amount based on current scale factor
-            current_scaled_amount = grain['original_amount'] * scale_factor
-            grain_data.append({
-                'Grain': grain['name'],
-                'Original (kg)': grain['original_amount'],
-                'Scaled (kg)': round(current_scaled_amount, 2)
-            })
-        grain_df = pd.DataFrame(grain_data)
-        st.dataframe(grain_df, use_container_width=True)
+        # Rescale the whole bill in one vectorized pass
+        grain_originals = _column(st.session_state.import_grain_bill, 'original_amount')
+        st.dataframe({
+            'Grain': [g['name'] for g in st.session_state.import_grain_bill],
+            'Original (kg)': grain_originals,
+            'Scaled (kg)': np.round(grain_originals * scale_factor, 2)
+        }, use_container_width=True)
         
-        if st.button("Clear Grain Bill", key="clear_import_grain"):
-            st.session_state.import_grain_bill = []
-            st.rerun()
+        st.button("Clear Grain Bill", key="clear_import_grain",
+                  on_click=_reset_state, kwargs={'import_grain_bill': []})
     
     st.markdown("---")
     
@@ -1155,56 +1420,39 @@ def recipe_scaler_page():
     if 'import_hop_schedule' not in st.session_state:
         st.session_state.import_hop_schedule = []
     
-    with st.expander("Add Hop Addition", expanded=True):
+    with st.expander("Add Hop Addition", expanded=True), st.form("import_hop_form", border=False):
         hcol1, hcol2, hcol3, hcol4 = st.columns([2, 1, 1, 1])
         
         with hcol1:
-            hop_name = st.text_input("Hop Variety", placeholder="e.g., Cascade", key="import_hop_name")
+            st.text_input("Hop Variety", placeholder="e.g., Cascade", key="import_hop_name")
         
         with hcol2:
-            hop_amount = st.number_input("Amount (g)", min_value=0.0, max_value=1000.0, value=28.0, step=5.0, key="import_hop_amount")
+            st.number_input("Amount (g)", min_value=0.0, max_value=1000.0, value=28.0, step=5.0, key="import_hop_amount")
         
         with hcol3:
-            hop_timing = st.number_input("Time (min)", min_value=0, max_value=120, value=60, step=5, key="import_hop_time")
+            st.number_input("Time (min)", min_value=0, max_value=120, value=60, step=5, key="import_hop_time")
         
         with hcol4:
             st.write("")
             st.write("")
-            if st.button("Add Hop", key="add_import_hop"):
-                if hop_name:
-                    scaled_amount = hop_amount * scale_factor
-                    st.session_state.import_hop_schedule.append({
-                        'variety': hop_name,
-                        'original_amount': hop_amount,
-                        'scaled_amount': round(scaled_amount, 1),
-                        'time': hop_timing
-                    })
-                    st.rerun()
+            st.form_submit_button("Add Hop", on_click=_add_import_hop, args=(scale_factor,))
         
         with st.container():
-            if st.button("Remove Last", key="remove_last_hop"):
-                if st.session_state.import_hop_schedule:
-                    st.session_state.import_hop_schedule.pop()
-                    st.rerun()
+            st.form_submit_button("Remove Last", on_click=_drop_last, args=('import_hop_schedule',))
     
     if st.session_state.import_hop_schedule:
         st.markdown("**Hop Schedule:**")
-        hop_data = []
-        for hop in st.session_state.import_hop_schedule:
-            # Recalculate scaled amount based on current scale factor
-            current_scaled_amount = hop['original_amount'] * scale_factor
-            hop_data.append({
-                'Variety': hop['variety'],
-                'Original (g)': hop['original_amount'],
-                'Scaled (g)': round(current_scaled_amount, 1),
-                'Time (min)': hop['time']
-            })
-        hop_df = pd.DataFrame(hop_data)
-        st.dataframe(hop_df, use_container_width=True)
-        
-        if st.button("Clear Hop Schedule", key="clear_import_hop"):
-            st.session_state.import_hop_schedule = []
-            st.rerun()
+        # Rescale the whole schedule in one vectorized pass
+        hop_originals = _column(st.session_state.import_hop_schedule, 'original_amount')
+        st.dataframe({
+            'Variety': [h['variety'] for h in st.session_state.import_hop_schedule],
+            'Original (g)': hop_originals,
+            'Scaled (g)': np.round(hop_originals * scale_factor, 1),
+            'Time (min)': [h['time'] for h in st.session_state.import_hop_schedule]
+        }, use_container_width=True)
+        
+        st.button("Clear Hop Schedule", key="clear_import_hop",
+                  on_click=_reset_state, kwargs={'import_hop_schedule': []})
     
     st.markdown("---")
     
@@ -1214,56 +1462,40 @@ def recipe_scaler_page():
     if 'import_other_ingredients' not in st.session_state:
         st.session_state.import_other_ingredients = []
     
-    with st.expander("Add Other Ingredient", expanded=False):
+    with st.expander("Add Other Ingredient", expanded=False), st.form("import_other_form", border=False):
         ocol1, ocol2, ocol3, ocol4, ocol5 = st.columns([2, 1, 1, 1, 1])
         
         with ocol1:
-            other_name = st.text_input("Ingredient", placeholder="e.g., Irish Moss, Yeast Nutrient", key="import_other_name")
+            st.text_input("Ingredient", placeholder="e.g., Irish Moss, Yeast Nutrient", key="import_other_name")
         
         with ocol2:
-            other_amount = st.number_input("Amount", min_value=0.0, max_value=10000.0, value=10.0, step=1.0, key="import_other_amount")
+            st.number_input("Amount", min_value=0.0, max_value=10000.0, value=10.0, step=1.0, key="import_other_amount")
         
         with ocol3:
-            other_unit = st.selectbox("Unit", ["g", "kg", "ml", "L", "tsp", "tbsp", "packet"], key="import_other_unit")
+            st.selectbox("Unit", ["g", "kg", "ml", "L", "tsp", "tbsp", "packet"], key="import_other_unit")
         
         with ocol4:
-            other_scale = st.checkbox("Scale", value=True, key="import_other_scale", help="Scale this ingredient with batch size")
+            st.checkbox("Scale", value=True, key="import_other_scale", help="Scale this ingredient with batch size")
         
         with ocol5:
             st.write("")
             st.write("")
-            if st.button("Add", key="add_import_other"):
-                if other_name:
-                    st.session_state.import_other_ingredients.append({
-                        'name': other_name,
-                        'original_amount': other_amount,
-                        'unit': other_unit,
-                        'should_scale': other_scale and other_unit in ["g", "kg", "ml", "L"]
-                    })
-                    st.rerun()
+            st.form_submit_button("Add", on_click=_add_import_other)
     
     if st.session_state.import_other_ingredients:
         st.markdown("**Other Ingredients:**")
-        other_data = []
-        for ingredient in st.session_state.import_other_ingredients:
-            # Recalculate scaled amount based on current scale factor and should_scale flag
-            should_scale = ingredient.get('should_scale', True)
-            if should_scale:
-                current_scaled_amount = ingredient['original_amount'] * scale_factor
-            else:
-                current_scaled_amount = ingredient['original_amount']
-            
-            other_data.append({
-                'Ingredient': ingredient['name'],
-                'Original': f"{ingredient['original_amount']} {ingredient['unit']}",
-                'Scaled': f"{round(current_scaled_amount, 3)} {ingredient['unit']}"
-            })
-        other_df = pd.DataFrame(other_data)
-        st.dataframe(other_df, use_container_width=True)
-        
-        if st.button("Clear Other Ingredients", key="clear_import_other"):
-            st.session_state.import_other_ingredients = []
-            st.rerun()
+        others = st.session_state.import_other_ingredients
+        # Ingredients flagged should_scale=False keep their original amount
+        factors = np.where([i.get('should_scale', True) for i in others], scale_factor, 1.0)
+        scaled = np.round(_column(others, 'original_amount') * factors, 3).tolist()
+        st.dataframe({
+            'Ingredient': [i['name'] for i in others],
+            'Original': [f"{i['original_amount']} {i['unit']}" for i in others],
+            'Scaled': [f"{amount} {i['unit']}" for amount, i in zip(scaled, others)]
+        }, use_container_width=True)
+        
+        st.button("Clear Other Ingredients", key="clear_import_other",
+                  on_click=_reset_state, kwargs={'import_other_ingredients': []})
     
     st.markdown("---")
     
@@ -1271,7 +1503,7 @@ def recipe_scaler_page():
     st.subheader("💧 Water Volumes")
     
     # Calculate total grain weight for water calculations (recalculate based on current scale factor)
-    total_grain_weight = sum(g['original_amount'] * scale_factor for g in st.session_state.import_grain_bill) if st.session_state.import_grain_bill else 0
+    total_grain_weight = float(_column(st.session_state.import_grain_bill, 'original_amount').sum()) * scale_factor
     
     wcol1, wcol2 = st.columns(2)
     
@@ -1335,17 +1567,13 @@ def recipe_scaler_page():
     
     gcol1, gcol2, gcol3 = st.columns(3)
     
-    # Use imported gravity values if available
-    default_og = imported_data.get('og', 1.050)
-    default_fg = imported_data.get('fg', 1.010)
-    
     with gcol1:
         target_og = st.number_input("Target OG", min_value=1.000, max_value=1.200, 
-                                   value=float(default_og) if default_og else 1.050, step=0.001, key="import_og")
+                                   value=default_og, step=0.001, key="import_og")
     
     with gcol2:
         target_fg = st.number_input("Final Gravity (FG)", min_value=1.000, max_value=1.030, 
-                                   value=float(default_fg) if default_fg else 1.010, step=0.001, key="import_fg")
+                                   value=default_fg, step=0.001, key="import_fg")
     
     with gcol3:
         st.write("")  # Spacer
@@ -1359,31 +1587,25 @@ def recipe_scaler_page():
     # Mash and Boil Section
     st.subheader("🔥 Mash & Boil")
     
-    # Use imported mash/boil values if available
-    default_mash_temp = imported_data.get('mash_temp', 67.0)
-    default_mash_time = imported_data.get('mash_time', 60)
-    default_boil_temp = imported_data.get('boil_temp', 100.0)
-    default_boil_time = imported_data.get('boil_time', 60)
-    
     mcol1, mcol2 = st.columns(2)
     
     with mcol1:
         mash_temp = st.number_input("Mash Temperature (°C)", min_value=60.0, max_value=77.0, 
-                                   value=float(default_mash_temp) if default_mash_temp else 67.0, step=0.5, key="import_mash_temp")
+                                   value=default_mash_temp, step=0.5, key="import_mash_temp")
     
     with mcol2:
         mash_time = st.number_input("Mash Time (minutes)", min_value=30, max_value=120, 
-                                   value=int(default_mash_time) if default_mash_time else 60, step=5, key="import_mash_time")
+                                   value=default_mash_time, step=5, key="import_mash_time")
     
     bcol1, bcol2 = st.columns(2)
     
     with bcol1:
         boil_temp = st.number_input("Boil Temperature (°C)", min_value=95.0, max_value=105.0, 
-                                   value=float(default_boil_temp) if default_boil_temp else 100.0, step=0.5, key="import_boil_temp")
+                                   value=default_boil_temp, step=0.5, key="import_boil_temp")
     
     with bcol2:
         boil_time = st.number_input("Boil Time (minutes)", min_value=30, max_value=120, 
-                                   value=int(default_boil_time) if default_boil_time else 60, step=5, key="import_boil_time")
+                                   value=default_boil_time, step=5, key="import_boil_time")
     
     st.markdown("---")
     
@@ -1392,24 +1614,19 @@ def recipe_scaler_page():
     
     fcol1, fcol2 = st.columns(2)
     
-    # Use imported fermentation values if available
-    default_yeast = imported_data.get('yeast', '')
-    default_ferm_temp = imported_data.get('fermentation_temp', 20.0)
-    default_ferm_days = imported_data.get('fermentation_days', 14)
-    
     with fcol1:
         yeast_info = st.text_input("Yeast", placeholder="e.g., US-05", key="import_yeast",
-                                  value=default_yeast if default_yeast else '')
+                                  value=default_yeast)
     
     with fcol2:
         fermentation_temp = st.number_input("Fermentation Temperature (°C)", min_value=10.0, max_value=30.0, 
-                                           value=float(default_ferm_temp) if default_ferm_temp else 20.0, step=0.5, key="import_ferm_temp")
+                                           value=default_ferm_temp, step=0.5, key="import_ferm_temp")
     
     fcol3, fcol4 = st.columns(2)
     
     with fcol3:
         fermentation_days = st.number_input("Fermentation Duration (days)", min_value=1, max_value=60, 
-                                          value=int(default_ferm_days) if default_ferm_days else 14, step=1, key="import_ferm_days")
+                                          value=default_ferm_days, step=1, key="import_ferm_days")
     
     with fcol4:
         st.write("")  # Spacer for alignment
@@ -1418,11 +1635,10 @@ def recipe_scaler_page():
     
     # Notes
     st.subheader("📝 Notes")
-    default_notes = imported_data.get('notes', '')
     recipe_notes = st.text_area("Recipe Notes & Instructions", 
                                 placeholder="Enter any additional notes, brewing instructions, or special techniques...",
                                 key="import_notes",
-                                value=default_notes if default_notes else '')
+                                value=default_notes)
     
     st.markdown("---")
     
@@ -1433,40 +1649,22 @@ def recipe_scaler_page():
         elif not st.session_state.import_grain_bill and not st.session_state.import_hop_schedule:
             st.error("Please add at least some ingredients")
         else:
-            # Convert grain bill to recipe format (recalculate with current scale factor)
-            grain_bill_converted = []
-            for grain in st.session_state.import_grain_bill:
-                grain_bill_converted.append({
-                    'type': grain['name'],
-                    'weight': round(grain['original_amount'] * scale_factor, 2),
-                    'ppg': 35,  # Default value
-                    'lovibond': 0  # Default value
-                })
-            
-            # Convert hop schedule to recipe format (recalculate with current scale factor)
-            hop_schedule_converted = []
-            for hop in st.session_state.import_hop_schedule:
-                hop_schedule_converted.append({
-                    'variety': hop['variety'],
-                    'weight': round(hop['original_amount'] * scale_factor, 1),
-                    'time': hop['time'],
-                    'alpha_acid': 0  # Default value
-                })
-            
-            # Convert other ingredients (recalculate with current scale factor)
-            other_ingredients_converted = []
-            if st.session_state.import_other_ingredients:
-                for ingredient in st.session_state.import_other_ingredients:
-                    should_scale = ingredient.get('should_scale', True)
-                    if should_scale:
-                        scaled_amt = ingredient['original_amount'] * scale_factor
-                    else:
-                        scaled_amt = ingredient['original_amount']
-                    other_ingredients_converted.append({
-                        'name': ingredient['name'],
-                        'amount': round(scaled_amt, 3),
-                        'unit': ingredient['unit']
-                    })
+            # Convert ingredients to recipe format (recalculate with current scale factor)
+            sf = scale_factor
+            grain_bill_converted = [
+                {'type': g['name'], 'weight': round(g['original_amount'] * sf, 2), 'ppg': 35, 'lovibond': 0}  # Default ppg/lovibond
+                for g in st.session_state.import_grain_bill
+            ]
+            hop_schedule_converted = [
+                {'variety': h['variety'], 'weight': round(h['original_amount'] * sf, 1), 'time': h['time'], 'alpha_acid': 0}  # Default alpha acid
+                for h in st.session_state.import_hop_schedule
+            ]
+            other_ingredients_converted = [
+                {'name': i['name'],
+                 'amount': round(i['original_amount'] * (sf if i.get('should_scale', True) else 1), 3),
+                 'unit': i['unit']}
+                for i in st.session_state.import_other_ingredients
+            ]
             
             # Use gravity values from inputs
             og_value = target_og if target_og else 0
@@ -1510,9 +1708,7 @@ def recipe_scaler_page():
             st.session_state.recipes.append(recipe)
             
             # Save to file
-            os.makedirs('data/recipes', exist_ok=True)
-            with open('data/recipes/recipes.json', 'w') as f:
-                json.dump(st.session_state.recipes, f, indent=2)
+            append_recipe(recipe)
             
             st.success(f"✅ Recipe '{recipe_name_import}' saved successfully!")
             st.info("📚 View your recipe in the 'View Recipes' page")
@@ -1523,11 +1719,8 @@ def recipe_scaler_page():
             st.session_state.import_other_ingredients = []
     
     # Clear all button
-    if st.button("🗑️ Clear All", key="clear_all_import"):
-            st.session_state.import_grain_bill = []
-            st.session_state.import_hop_schedule = []
-            st.session_state.import_other_ingredients = []
-            st.rerun()
+    st.button("🗑️ Clear All", key="clear_all_import", on_click=_reset_state,
+              kwargs={'import_grain_bill': [], 'import_hop_schedule': [], 'import_other_ingredients': []})
 
 
 def generate_recipe_page():
@@ -1538,7 +1731,7 @@ def generate_recipe_page():
     # Check if model is available
     try:
         import torch
-        from bin.train_template_model import RecipeGeneratorModel
+        from bin.train_template_model import RecipeGeneratorModel, load_checkpoint
         model_available = True
     except ImportError:
         model_available = False
@@ -1553,7 +1746,7 @@ def generate_recipe_page():
             if not os.path.exists(model_path):
                 return None, None, f"Model not found at {model_path}. Please train the model first."
             
-            checkpoint = torch.load(model_path, weights_only=False)
+            checkpoint = load_checkpoint(model_path)
             model = RecipeGeneratorModel(
                 num_styles=checkpoint['num_styles'],
                 num_grains=checkpoint['num_grains'],
@@ -1672,7 +1865,7 @@ def generate_recipe_page():
                             grains_data.append({"Grain": grain_name, "Amount": weight_str})
                 
                 if grains_data:
-                    st.table(pd.DataFrame(grains_data))
+                    st.table(grains_data)
                 else:
                     st.warning("No grains generated")
                 
@@ -1713,7 +1906,7 @@ def generate_recipe_page():
                             })
                 
                 if hops_data:
-                    st.table(pd.DataFrame(hops_data))
+                    st.table(hops_data)
                 else:
                     st.warning("No hops generated")
                 
@@ -1,101 +1,129 @@
 """
 Create downsampled training dataset with top 100 recipes per style, formatted for training.
 """
+import hashlib
+import heapq
 import json
 import os
+import re
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# First whitespace-delimited token that looks like a yeast code (WLP, US-, DIPA, or starting S- / K-)
+YEAST_CODE_RE = re.compile(r'(?<!\S)(?:\S*(?:WLP|US-|DIPA)|[SK]-)\S*')
+
+# Fixed section markers and the metadata block template shared by every formatted recipe
+_HDR_START = "<|startofrecipe|>\n"
+_HDR_GRAINS = "<|grainbill|>\nGrain Bill:\n"
+_HDR_HOPS = "\n<|hopschedule|>\nHop Schedule:\n"
+_HDR_YEAST = "\n<|yeast|>\n"
+_HDR_NOTES = "\n<|notes|>\n"
+_HDR_END = "<|endofrecipe|>\n\n"
+_META_FMT = "Recipe: %s\nStyle: %s\nMethod: %s\nBatch Size: %s litres\nOG: %s\nFG: %s\nABV: %s%%\n\n"
+
+
+def _load_json(path):
+    """Parse a JSON file, using orjson when available."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _recipe_digest(recipe):
+    """Short hash of a recipe's canonical (sorted-key) JSON form, used for deduplication."""
+    if orjson is not None:
+        canonical = orjson.dumps(recipe, option=orjson.OPT_SORT_KEYS)
+    else:
+        canonical = json.dumps(recipe, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+def _fmt_weight(weight):
+    """Format a grain weight with its unit; small values are taken to be kg, larger ones grams."""
+    return f"{weight}kg" if weight < 50 else f"{weight}g"
+
+
 def format_recipe_for_training(recipe):
     """Convert a recipe dict into formatted training text."""
-    text = "<|startofrecipe|>\n"
-    
-    # Add metadata
-    text += f"Recipe: {recipe['name']}\n"
-    text += f"Style: {recipe.get('style', 'Unknown')}\n"
-    text += f"Method: {recipe.get('method', 'All Grain')}\n"
-    text += f"Batch Size: {recipe.get('batch_size', 10)} litres\n"
-    text += f"OG: {recipe.get('og', 1.050)}\n"
-    text += f"FG: {recipe.get('fg', 1.010)}\n"
-    text += f"ABV: {recipe.get('abv', 5)}%\n\n"
+    parts = [_HDR_START, _META_FMT % (
+        recipe['name'],
+        recipe.get('style', 'Unknown'),
+        recipe.get('method', 'All Grain'),
+        recipe.get('batch_size', 10),
+        recipe.get('og', 1.050),
+        recipe.get('fg', 1.010),
+        recipe.get('abv', 5),
+    )]
     
     # Add grain bill
-    text += "<|grainbill|>\n"
-    text += "Grain Bill:\n"
+    parts.append(_HDR_GRAINS)
     grain_bill = (recipe.get('grain_bill') or 
                   recipe.get('malts') or 
                   recipe.get('grains') or 
                   recipe.get('fermentables') or [])
     for grain in grain_bill:
-        if isinstance(grain, dict):
-            weight = grain.get('weight', grain.get('amount', 0))
+        if type(grain) is dict:  # Common case first
+            get = grain.get
+            weight = get('weight', get('amount', 0))
             try:
                 weight = float(weight)
             except (ValueError, TypeError):
                 weight = 0
-            grain_type = (grain.get('type') or 
-                         grain.get('name') or 
-                         grain.get('grain_type', 'Unknown'))
-            ppg = grain.get('ppg', grain.get('potential', 'N/A'))
-            lovibond = grain.get('lovibond', grain.get('color', 'N/A'))
-            # Convert to grams if weight is in kg
-            if weight < 50:  # Likely in kg
-                weight_str = f"{weight}kg"
-            else:  # Likely in grams
-                weight_str = f"{weight}g"
-            text += f"  - {weight_str} {grain_type}\n"
+            grain_type = get('type') or get('name') or get('grain_type', 'Unknown')
+            parts.append(f"  - {_fmt_weight(weight)} {grain_type}\n")
         elif isinstance(grain, list) and len(grain) >= 4:
             # Handle list format: [weight, type, ppg, lovibond] - try this order
-            weight, grain_type, ppg, lovibond = grain[:4]
+            weight, grain_type = grain[:2]
             try:
                 weight = float(weight)
             except (ValueError, TypeError):
                 weight = 0
-            if weight < 50:
-                weight_str = f"{weight}kg"
-            else:
-                weight_str = f"{weight}g"
-            text += f"  - {weight_str} {grain_type}\n"
+            parts.append(f"  - {_fmt_weight(weight)} {grain_type}\n")
         else:
             # Skip malformed grain entries
             continue
     
     # Add hop schedule
-    text += "\n<|hopschedule|>\n"
-    text += "Hop Schedule:\n"
+    parts.append(_HDR_HOPS)
     hop_schedule = (recipe.get('hop_schedule') or 
                    recipe.get('hops') or 
                    recipe.get('hop_additions') or [])
     for hop in hop_schedule:
-        if isinstance(hop, dict):
-            weight = hop.get('weight', hop.get('amount', 0))
+        if type(hop) is dict:  # Common case first
+            get = hop.get
+            weight = get('weight', get('amount', 0))
             try:
                 weight = float(weight)
             except (ValueError, TypeError):
                 weight = 0
-            variety = hop.get('variety', hop.get('name', 'Unknown'))
-            time = hop.get('time', hop.get('addition_time', 0))
+            variety = get('variety', get('name', 'Unknown'))
+            time = get('time', get('addition_time', 0))
             try:
                 time = int(float(time))
             except (ValueError, TypeError):
                 time = 60  # default to 60 min if not a number
-            alpha_acid = hop.get('alpha_acid', hop.get('aa', 'N/A'))
-            text += f"  - {weight}g {variety} at {time} min\n"
+            parts.append(f"  - {weight}g {variety} at {time} min\n")
         elif isinstance(hop, list) and len(hop) >= 4:
             # Handle list format: [weight, variety, time, alpha_acid] - try this order
-            weight, variety, time, alpha_acid = hop[:4]
+            weight, variety, time = hop[:3]
             try:
                 weight = float(weight)
                 time = int(float(time)) if time.replace('.', '').isdigit() else 60
             except (ValueError, TypeError, AttributeError):
                 weight = 0
                 time = 60
-            text += f"  - {weight}g {variety} at {time} min\n"
+            parts.append(f"  - {weight}g {variety} at {time} min\n")
         else:
             # Skip malformed hop entries
             continue
     
     # Add yeast
-    text += f"\n<|yeast|>\n"
+    parts.append(_HDR_YEAST)
     yeast = (recipe.get('yeast') or 
             recipe.get('yeast_strain') or 
             recipe.get('fermentation', {}).get('yeast', 'Unknown'))
@@ -109,31 +137,25 @@ def format_recipe_for_training(recipe):
     
     # Clean up yeast string to remove extra parameters
     if yeast_str != 'Unknown':
-        words = yeast_str.split()
-        # Find yeast code (WLP, US-, etc.)
-        code_idx = -1
-        for i, word in enumerate(words):
-            if ('WLP' in word or 'US-' in word or 'DIPA' in word or 
-                word.startswith('S-') or word.startswith('K-')):
-                code_idx = i
-                break
-        if code_idx >= 0:
+        match = YEAST_CODE_RE.search(yeast_str)
+        if match:
             # Take up to and including the code
-            yeast_str = ' '.join(words[:code_idx + 1])
+            yeast_str = ' '.join(yeast_str[:match.end()].split())
         else:
             # If no code found, take first few words
+            words = yeast_str.split()
             yeast_str = ' '.join(words[:4]) if len(words) > 4 else yeast_str
     
-    text += f"Yeast: {yeast_str}\n"
+    parts.append(f"Yeast: {yeast_str}\n")
     
     # Add notes if present
     if recipe.get('notes'):
-        text += f"\n<|notes|>\n"
-        text += f"Notes: {recipe['notes']}\n"
+        parts.append(_HDR_NOTES)
+        parts.append(f"Notes: {recipe['notes']}\n")
     
-    text += "<|endofrecipe|>\n\n"
+    parts.append(_HDR_END)
     
-    return text
+    return "".join(parts)
 
 def create_downsampled_training_data(output_file='data/ml/downsampled_training_data.txt', include_full_recipes=False):
     """Create training data from top 100 recipes per style."""
@@ -150,75 +172,83 @@ def create_downsampled_training_data(output_file='data/ml/downsampled_training_d
     
     for input_file in recipe_files:
         if os.path.exists(input_file):
-            with open(input_file, 'r') as f:
-                file_recipes = json.load(f)
-                recipes.extend(file_recipes)
-                if 'guys' in input_file:
-                    guys_recipes = file_recipes
-                elif 'mathieu' in input_file:
-                    mathieu_recipes = file_recipes
-                print(f"Loaded {len(file_recipes)} recipes from {input_file}")
+            file_recipes = _load_json(input_file)
+            recipes.extend(file_recipes)
+            if 'guys' in input_file:
+                guys_recipes = file_recipes
+            elif 'mathieu' in input_file:
+                mathieu_recipes = file_recipes
+            print(f"Loaded {len(file_recipes)} recipes from {input_file}")
         else:
             print(f"Warning: {input_file} not found, skipping...")
     
-    # Optionally include recipes from recipes_full.txt
+    # Optionally include recipes from recipes_full.txt (parsed once, reused below)
+    full_recipes = None
     if include_full_recipes and os.path.exists('data/ml/recipes_full.txt'):
-        with open('data/ml/recipes_full.txt', 'r') as f:
-            full_data = json.load(f)
-            full_recipes = list(full_data.values())  # Convert dict values to list
-            recipes.extend(full_recipes)
-            print(f"Loaded {len(full_recipes)} recipes from data/ml/recipes_full.txt")
+        full_data = _load_json('data/ml/recipes_full.txt')
+        full_recipes = list(full_data.values())  # Convert dict values to list
+        print(f"Loaded {len(full_recipes)} recipes from data/ml/recipes_full.txt")
     
-    print(f"\nTotal recipes loaded: {len(recipes)}")
+    print(f"\nTotal recipes loaded: {len(recipes) + len(full_recipes or ())}")
     
     # Always include all recipes from guys and mathieu
     selected_recipes = guys_recipes + mathieu_recipes
     print(f"Included all {len(guys_recipes)} Guy's recipes and {len(mathieu_recipes)} Mathieu's recipes")
     
     # Downsample recipes from recipes_full.txt: top 100 per style
-    if include_full_recipes and os.path.exists('data/ml/recipes_full.txt'):
-        with open('data/ml/recipes_full.txt', 'r') as f:
-            full_data = json.load(f)
-            full_recipes = list(full_data.values())
-        
-        # Filter for All Grain recipes from full dataset
-        full_all_grain = [r for r in full_recipes if r.get('method') == 'All Grain']
-        
-        # Group by style and take top 100 per style
-        from collections import defaultdict
-        recipes_by_style = defaultdict(list)
-        for recipe in full_all_grain:
-            style = recipe.get('style', 'Unknown')
-            recipes_by_style[style].append(recipe)
+    if full_recipes is not None:
+        # Keep a bounded min-heap of the top 100 All Grain recipes by ABV per style in a single pass.
+        # The negated position breaks ABV ties in favour of earlier recipes and keeps dicts out of comparisons.
+        heaps_by_style = defaultdict(list)
+        for position, recipe in enumerate(full_recipes):
+            if recipe.get('method') != 'All Grain':
+                continue
+            heap = heaps_by_style[recipe.get('style', 'Unknown')]
+            item = (recipe.get('abv', 0) or 0, -position, recipe)
+            if len(heap) < 100:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
         
-        top_recipes_full = []
-        for style, style_recipes in recipes_by_style.items():
-            # Sort by ABV descending
-            sorted_recipes = sorted(style_recipes, key=lambda x: x.get('abv', 0), reverse=True)
-            # Take top 100
-            top_recipes_full.extend(sorted_recipes[:100])
+        top_recipes_full = [item[2] for heap in heaps_by_style.values() for item in sorted(heap, reverse=True)]
         
-        print(f"Selected {len(top_recipes_full)} top recipes from {len(recipes_by_style)} styles in recipes_full.txt")
+        print(f"Selected {len(top_recipes_full)} top recipes from {len(heaps_by_style)} styles in recipes_full.txt")
         selected_recipes.extend(top_recipes_full)
     
-    # Combine and deduplicate
-    recipes = list({json.dumps(r, sort_keys=True): r for r in selected_recipes}.values())  # Remove duplicates
+    # Combine and deduplicate. Recipes are grouped on the cheap (name, brewer, batch_size) identity;
+    # only those sharing an identity with an earlier recipe are compared by a digest of their full content
+    kept_by_key = {}
+    digests_by_key = {}
+    recipes = []
+    for recipe in selected_recipes:
+        key = (recipe.get('name'), recipe.get('brewer'), recipe.get('batch_size'))
+        kept = kept_by_key.get(key)
+        if kept is None:
+            kept_by_key[key] = [recipe]
+            recipes.append(recipe)
+            continue
+        digests = digests_by_key.get(key)
+        if digests is None:
+            digests = digests_by_key[key] = {_recipe_digest(r) for r in kept}
+        digest = _recipe_digest(recipe)
+        if digest not in digests:
+            digests.add(digest)
+            kept.append(recipe)
+            recipes.append(recipe)
     
     print(f"Total unique recipes after deduplication: {len(recipes)}")
     
-    # Convert all selected recipes to text
-    training_text = ""
-    for recipe in recipes:
-        training_text += format_recipe_for_training(recipe)
+    # Format and stream each recipe straight to disk rather than building the corpus in memory
+    total_length = 0
+    with open(output_file, 'w', buffering=1 << 20) as f:
+        for recipe in recipes:
+            text = format_recipe_for_training(recipe)
+            f.write(text)
+            total_length += len(text)
     
     print(f"Formatted {len(recipes)} recipes for training")
-    
-    # Save training data
-    with open(output_file, 'w') as f:
-        f.write(training_text)
-    
     print(f"Saved downsampled training data to {output_file}")
-    print(f"Total training text length: {len(training_text)} characters")
+    print(f"Total training text length: {total_length} characters")
 
 if __name__ == "__main__":
     create_downsampled_training_data(include_full_recipes=True)
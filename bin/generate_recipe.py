@@ -7,11 +7,15 @@ Usage:
 """
 import torch
 import argparse
-from train_template_model import RecipeGeneratorModel
+from train_template_model import RecipeGeneratorModel, load_checkpoint
 
+@torch.inference_mode()
 def generate_recipe(model, style, abv, og, fg, batch_size, 
-                   style_to_idx, idx_to_grain, idx_to_hop, idx_to_yeast, characteristic=None):
-    """Generate a complete recipe from style and parameters."""
+                   style_to_idx, grain_tbl, hop_tbl, yeast_tbl, characteristic=None):
+    """Generate a complete recipe from style and parameters.
+
+    The *_tbl arguments are index -> name tuples (see ``_name_table``).
+    """
     
     model.eval()
     
@@ -19,9 +23,8 @@ def generate_recipe(model, style, abv, og, fg, batch_size,
     style_idx = style_to_idx.get(style, 0)
     inputs = torch.tensor([[style_idx, abv, og, fg, batch_size]], dtype=torch.float32)
     
-    # Generate predictions
-    with torch.no_grad():
-        outputs = model(inputs)
+    # Generate predictions (inference mode also skips autograd version tracking)
+    outputs = model(inputs)
     
     # Extract predictions
     grain_weights = outputs['grain_weights'][0].tolist()
@@ -30,61 +33,65 @@ def generate_recipe(model, style, abv, og, fg, batch_size,
     yeast_idx = torch.argmax(outputs['yeast_logits'], dim=1).item()
     
     # Build structured recipe text
-    recipe_text = "<|startofrecipe|>\n"
+    parts = ["<|startofrecipe|>\n"]
     if characteristic:
-        recipe_text += f"Recipe: {characteristic} {style}\n"
+        parts.append(f"Recipe: {characteristic} {style}\n")
     else:
-        recipe_text += f"Recipe: {style} Recipe\n"
-    recipe_text += f"Style: {style}\n"
-    recipe_text += f"Method: All Grain\n"
-    recipe_text += f"Batch Size: {batch_size} litres\n"
-    recipe_text += f"OG: {og:.3f}\n"
-    recipe_text += f"FG: {fg:.3f}\n"
-    recipe_text += f"ABV: {abv:.1f}%\n\n"
+        parts.append(f"Recipe: {style} Recipe\n")
+    parts.append(f"Style: {style}\n")
+    parts.append(f"Method: All Grain\n")
+    parts.append(f"Batch Size: {batch_size} litres\n")
+    parts.append(f"OG: {og:.3f}\n")
+    parts.append(f"FG: {fg:.3f}\n")
+    parts.append(f"ABV: {abv:.1f}%\n\n")
     
-    recipe_text += "<|grainbill|>\n"
-    recipe_text += "Grain Bill:\n"
+    parts.append("<|grainbill|>\n")
+    parts.append("Grain Bill:\n")
     
     # Get top 5 grain predictions
     grain_logits = outputs['grain_logits'][0]
-    top_grains = torch.topk(grain_logits, k=min(5, len(idx_to_grain)))
+    top_grains = torch.topk(grain_logits, k=min(5, len(grain_tbl))).indices.tolist()
     
-    for i, (score, idx) in enumerate(zip(top_grains.values, top_grains.indices)):
+    for i, idx in enumerate(top_grains):
         if i < len(grain_weights) and grain_weights[i] > 0:
-            grain_name = idx_to_grain.get(idx.item(), 'Unknown')
+            grain_name = grain_tbl[idx]
             weight = grain_weights[i]
             # Convert grams to kg if weight is large (> 1000g)
             if weight > 1000:
-                recipe_text += f"  - {weight/1000:.2f}kg {grain_name}\n"
+                parts.append(f"  - {weight/1000:.2f}kg {grain_name}\n")
             else:
-                recipe_text += f"  - {weight:.0f}g {grain_name}\n"
+                parts.append(f"  - {weight:.0f}g {grain_name}\n")
     
-    recipe_text += "\n<|hopschedule|>\n"
-    recipe_text += "Hop Schedule:\n"
+    parts.append("\n<|hopschedule|>\n")
+    parts.append("Hop Schedule:\n")
     
     # Get top 4 hop predictions
     hop_logits = outputs['hop_logits'][0]
-    top_hops = torch.topk(hop_logits, k=min(4, len(idx_to_hop)))
+    top_hops = torch.topk(hop_logits, k=min(4, len(hop_tbl))).indices.tolist()
     
-    for i, (score, idx) in enumerate(zip(top_hops.values, top_hops.indices)):
+    for i, idx in enumerate(top_hops):
         if i < len(hop_weights) and hop_weights[i] > 0:
-            hop_name = idx_to_hop.get(idx.item(), 'Unknown')
+            hop_name = hop_tbl[idx]
             weight = hop_weights[i]
             time = max(0, hop_times[i])
-            recipe_text += f"  - {weight:.0f}g {hop_name} at {time:.0f} min\n"
+            parts.append(f"  - {weight:.0f}g {hop_name} at {time:.0f} min\n")
     
-    recipe_text += f"\n<|yeast|>\n"
-    yeast_name = idx_to_yeast.get(yeast_idx, 'Unknown')
-    recipe_text += f"Yeast: {yeast_name}\n"
+    parts.append(f"\n<|yeast|>\n")
+    yeast_name = yeast_tbl[yeast_idx]
+    parts.append(f"Yeast: {yeast_name}\n")
     
     # Add characteristic as notes if provided
     if characteristic:
-        recipe_text += f"\n<|notes|>\n"
-        recipe_text += f"Notes: This recipe emphasizes {characteristic.lower()} characteristics.\n"
+        parts.append(f"\n<|notes|>\n")
+        parts.append(f"Notes: This recipe emphasizes {characteristic.lower()} characteristics.\n")
     
-    recipe_text += "<|endofrecipe|>\n"
+    parts.append("<|endofrecipe|>\n")
     
-    return recipe_text
+    return "".join(parts)
+
+def _name_table(idx_to_name, size):
+    """Dense index -> name tuple, so lookups are a plain index instead of a dict get."""
+    return tuple(idx_to_name.get(i, 'Unknown') for i in range(size))
 
 def main():
     parser = argparse.ArgumentParser(description='Generate a beer recipe')
@@ -101,7 +108,7 @@ def main():
     
     # Load model
     print(f"Loading model from {args.model}...")
-    checkpoint = torch.load(args.model, weights_only=False)
+    checkpoint = load_checkpoint(args.model)
     
     model = RecipeGeneratorModel(
         num_styles=checkpoint['num_styles'],
@@ -125,9 +132,9 @@ def main():
         args.fg, 
         args.batch_size,
         checkpoint['style_to_idx'],
-        checkpoint['idx_to_grain'],
-        checkpoint['idx_to_hop'],
-        checkpoint['idx_to_yeast'],
+        _name_table(checkpoint['idx_to_grain'], checkpoint['num_grains']),
+        _name_table(checkpoint['idx_to_hop'], checkpoint['num_hops']),
+        _name_table(checkpoint['idx_to_yeast'], checkpoint['num_yeasts']),
         args.characteristic
     )
     
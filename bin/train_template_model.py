@@ -10,18 +10,33 @@ Requirements:
     pip install torch scikit-learn pandas numpy
 """
 import json
+import os
 import torch
+import torch.distributed as dist
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset
 import numpy as np
 from collections import defaultdict
 import pickle
+import re
+
+# Recipe text parsing (see create_downsampled_training_data.py for the format)
+_KEY_RE = re.compile(r'^(Recipe|Style|ABV|OG|FG|Batch Size|Yeast):.*', re.M)
+_GRAIN_BLOCK_RE = re.compile(r'<\|grainbill\|>[^\n]*\n(.*?)^[^\n]*<\|hopschedule\|>', re.S | re.M)
+_HOP_BLOCK_RE = re.compile(r'<\|hopschedule\|>[^\n]*\n(.*?)^[^\n]*<\|yeast\|>', re.S | re.M)
+_GRAIN_LINE_RE = re.compile(r'^[ \t]*-[- ]*(\S+)[ \t]+(.*\S)', re.M)
+_HOP_LINE_RE = re.compile(r'^[ \t]*-[- ]*(\S+)[ \t]+(\S+)[ \t]+\S+[ \t]+(\S+)', re.M)
 
 class RecipeDataset(Dataset):
-    """Dataset where each example is a complete recipe with all its parameters."""
+    """Dataset where each example is a complete recipe with all its parameters.
+
+    Recipes are encoded once up front into contiguous per-field arrays, so indexing is a
+    plain tensor slice rather than re-parsing the recipe dict on every access.
+    """
     
     def __init__(self, recipes, style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx):
-        self.recipes = recipes
         self.style_to_idx = style_to_idx
         self.grain_to_idx = grain_to_idx
         self.hop_to_idx = hop_to_idx
@@ -30,95 +45,100 @@ class RecipeDataset(Dataset):
         self.max_grain_idx = len(grain_to_idx) - 1
         self.max_hop_idx = len(hop_to_idx) - 1
         
-    def __len__(self):
-        return len(self.recipes)
-    
-    def __getitem__(self, idx):
-        recipe = self.recipes[idx]
-        
-        # Input: style + target ABV + target OG
-        style_idx = self.style_to_idx.get(recipe['style'], 0)
-        abv = float(recipe.get('abv', 5.0))
-        og = float(recipe.get('og', 1.050))
-        fg = float(recipe.get('fg', 1.010))
-        batch_size = float(recipe.get('batch_size', 10))
-        
-        # Encode grains (top 5)
-        grain_bill = recipe.get('grain_bill', [])[:5]
-        grain_indices = []
-        grain_weights = []
-        for grain in grain_bill:
-            if isinstance(grain, dict):
-                grain_type = grain.get('type') or grain.get('name', 'Unknown')
-                weight = float(grain.get('weight', 0))
-            elif isinstance(grain, list) and len(grain) >= 2:
-                weight, grain_type = grain[0], grain[1]
-                weight = float(weight)
-            else:
-                continue
+        n = len(recipes)
+        # Input features: [style, abv, og, fg, batch_size]
+        input_features = np.zeros((n, 5), dtype=np.float32)
+        # Output targets: top 5 grains, top 4 hops, yeast (zero-padded)
+        grain_indices = np.zeros((n, 5), dtype=np.int64)
+        grain_weights = np.zeros((n, 5), dtype=np.float32)
+        grain_mask = np.zeros((n, 5), dtype=np.float32)  # 1.0 for real slots, 0.0 for padding
+        hop_indices = np.zeros((n, 4), dtype=np.int64)
+        hop_weights = np.zeros((n, 4), dtype=np.float32)
+        hop_times = np.zeros((n, 4), dtype=np.float32)
+        hop_mask = np.zeros((n, 4), dtype=np.float32)
+        yeast_idx = np.zeros(n, dtype=np.int64)
+        
+        for row, recipe in enumerate(recipes):
+            input_features[row] = (
+                style_to_idx.get(recipe['style'], 0),
+                float(recipe.get('abv', 5.0)),
+                float(recipe.get('og', 1.050)),
+                float(recipe.get('fg', 1.010)),
+                float(recipe.get('batch_size', 10)),
+            )
             
-            grain_idx = self.grain_to_idx.get(grain_type, 0)
-            grain_indices.append(grain_idx)
-            grain_weights.append(weight)
-        
-        # Pad to 5 grains
-        while len(grain_indices) < 5:
-            grain_indices.append(0)
-            grain_weights.append(0.0)
-        
-        # Encode hops (top 4)
-        hop_schedule = recipe.get('hop_schedule', [])[:4]
-        hop_indices = []
-        hop_weights = []
-        hop_times = []
-        for hop in hop_schedule:
-            if isinstance(hop, dict):
-                variety = hop.get('variety') or hop.get('name', 'Unknown')
-                weight = float(hop.get('weight', 0))
-                time = float(hop.get('time', 60))
-            elif isinstance(hop, list) and len(hop) >= 3:
-                weight, variety, time = hop[0], hop[1], hop[2]
-                weight = float(weight)
-                time = float(time)
+            # Encode grains (top 5)
+            col = 0
+            for grain in recipe.get('grain_bill', [])[:5]:
+                if isinstance(grain, dict):
+                    grain_type = grain.get('type') or grain.get('name', 'Unknown')
+                    weight = float(grain.get('weight', 0))
+                elif isinstance(grain, list) and len(grain) >= 2:
+                    weight, grain_type = grain[0], grain[1]
+                    weight = float(weight)
+                else:
+                    continue
+                
+                grain_indices[row, col] = grain_to_idx.get(grain_type, 0)
+                grain_weights[row, col] = weight
+                grain_mask[row, col] = 1.0
+                col += 1
+            
+            # Encode hops (top 4)
+            col = 0
+            for hop in recipe.get('hop_schedule', [])[:4]:
+                if isinstance(hop, dict):
+                    variety = hop.get('variety') or hop.get('name', 'Unknown')
+                    weight = float(hop.get('weight', 0))
+                    time = float(hop.get('time', 60))
+                elif isinstance(hop, list) and len(hop) >= 3:
+                    weight, variety, time = hop[0], hop[1], hop[2]
+                    weight = float(weight)
+                    time = float(time)
+                else:
+                    continue
+                
+                hop_indices[row, col] = hop_to_idx.get(variety, 0)
+                hop_weights[row, col] = weight
+                hop_times[row, col] = time
+                hop_mask[row, col] = 1.0
+                col += 1
+            
+            # Encode yeast
+            yeast = recipe.get('yeast', 'Unknown')
+            if isinstance(yeast, list):
+                yeast = ' '.join(str(y) for y in yeast)
+            elif isinstance(yeast, dict):
+                yeast = yeast.get('name', 'Unknown')
             else:
-                continue
+                yeast = str(yeast)
             
-            hop_idx = self.hop_to_idx.get(variety, 0)
-            hop_indices.append(hop_idx)
-            hop_weights.append(weight)
-            hop_times.append(time)
-        
-        # Pad to 4 hops
-        while len(hop_indices) < 4:
-            hop_indices.append(0)
-            hop_weights.append(0.0)
-            hop_times.append(0.0)
-        
-        # Encode yeast
-        yeast = recipe.get('yeast', 'Unknown')
-        if isinstance(yeast, list):
-            yeast = ' '.join(str(y) for y in yeast)
-        elif isinstance(yeast, dict):
-            yeast = yeast.get('name', 'Unknown')
-        else:
-            yeast = str(yeast)
-        
-        yeast_idx = self.yeast_to_idx.get(yeast, 0)
-        
-        # Input features: [style, abv, og, fg, batch_size]
-        input_features = torch.tensor([style_idx, abv, og, fg, batch_size], dtype=torch.float32)
-        
-        # Output targets: grains, hops, yeast
-        output = {
-            'grain_indices': torch.tensor(grain_indices, dtype=torch.long),
-            'grain_weights': torch.tensor(grain_weights, dtype=torch.float32),
-            'hop_indices': torch.tensor(hop_indices, dtype=torch.long),
-            'hop_weights': torch.tensor(hop_weights, dtype=torch.float32),
-            'hop_times': torch.tensor(hop_times, dtype=torch.float32),
-            'yeast_idx': torch.tensor(min(yeast_idx, len(self.yeast_to_idx) - 1), dtype=torch.long)
+            yeast_idx[row] = min(yeast_to_idx.get(yeast, 0), self.max_yeast_idx)
+        
+        # Zero-copy tensor views over the arrays
+        self.input_features = torch.from_numpy(input_features)
+        self.targets = {
+            'grain_indices': torch.from_numpy(grain_indices),
+            'grain_weights': torch.from_numpy(grain_weights),
+            'grain_mask': torch.from_numpy(grain_mask),
+            'hop_indices': torch.from_numpy(hop_indices),
+            'hop_weights': torch.from_numpy(hop_weights),
+            'hop_times': torch.from_numpy(hop_times),
+            'hop_mask': torch.from_numpy(hop_mask),
+            'yeast_idx': torch.from_numpy(yeast_idx),
         }
         
-        return input_features, output
+    def __len__(self):
+        return len(self.input_features)
+    
+    def __getitem__(self, idx):
+        return self.input_features[idx], {key: values[idx] for key, values in self.targets.items()}
+    
+    def to(self, device):
+        """Move all encoded arrays to ``device`` in one go; returns self."""
+        self.input_features = self.input_features.to(device)
+        self.targets = {key: values.to(device) for key, values in self.targets.items()}
+        return self
 
 class RecipeGeneratorModel(nn.Module):
     """Neural network that predicts recipe components from style and target parameters."""
@@ -139,17 +159,23 @@ class RecipeGeneratorModel(nn.Module):
             nn.Dropout(0.2),
         )
         
-        # Grain prediction: 5 grains with types and weights
-        self.grain_type_head = nn.Linear(512, num_grains)  # Classify grain types
-        self.grain_weight_head = nn.Linear(512, 5)  # Predict 5 grain weights
-        
-        # Hop prediction: 4 hops with varieties, weights, and times
-        self.hop_variety_head = nn.Linear(512, num_hops)
-        self.hop_weight_head = nn.Linear(512, 4)
-        self.hop_time_head = nn.Linear(512, 4)
-        
-        # Yeast prediction
-        self.yeast_head = nn.Linear(512, num_yeasts)
+        # All output heads share one Linear layer (a single GEMM), split in forward into:
+        # grain types, 5 grain weights, hop varieties, 4 hop weights, 4 hop times, yeast
+        self.head_sizes = [num_grains, 5, num_hops, 4, 4, num_yeasts]
+        self.combined_head = nn.Linear(512, sum(self.head_sizes))
+    
+    # Separate per-head layers used by checkpoints saved before the heads were fused, in output order
+    _LEGACY_HEADS = ('grain_type_head', 'grain_weight_head', 'hop_variety_head',
+                     'hop_weight_head', 'hop_time_head', 'yeast_head')
+    
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Concatenate legacy per-head weights into the fused head so old checkpoints still load
+        if f'{prefix}grain_type_head.weight' in state_dict:
+            for param in ('weight', 'bias'):
+                state_dict[f'{prefix}combined_head.{param}'] = torch.cat(
+                    [state_dict.pop(f'{prefix}{head}.{param}') for head in self._LEGACY_HEADS]
+                )
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
         
     def forward(self, x):
         # x shape: [batch, 5] where first element is style index
@@ -168,14 +194,13 @@ class RecipeGeneratorModel(nn.Module):
         hidden = self.input_fc(combined)
         
         # Predict components
-        grain_logits = self.grain_type_head(hidden)  # [batch, num_grains]
-        grain_weights = self.grain_weight_head(hidden)  # [batch, 5]
-        
-        hop_logits = self.hop_variety_head(hidden)  # [batch, num_hops]
-        hop_weights = self.hop_weight_head(hidden)  # [batch, 4]
-        hop_times = self.hop_time_head(hidden)  # [batch, 4]
-        
-        yeast_logits = self.yeast_head(hidden)  # [batch, num_yeasts]
+        (grain_logits,   # [batch, num_grains]
+         grain_weights,  # [batch, 5]
+         hop_logits,     # [batch, num_hops]
+         hop_weights,    # [batch, 4]
+         hop_times,      # [batch, 4]
+         yeast_logits,   # [batch, num_yeasts]
+         ) = torch.split(self.combined_head(hidden), self.head_sizes, dim=1)
         
         return {
             'grain_logits': grain_logits,
@@ -186,7 +211,7 @@ class RecipeGeneratorModel(nn.Module):
             'yeast_logits': yeast_logits
         }
 
-def load_and_preprocess_recipes(data_file='data/ml/downsampled_training_data.txt'):
+def load_and_preprocess_recipes(data_file='data/ml/downsampled_training_data.txt', verbose=True):
     """Load recipes from formatted text file."""
     
     with open(data_file, 'r', encoding='utf-8') as f:
@@ -197,98 +222,79 @@ def load_and_preprocess_recipes(data_file='data/ml/downsampled_training_data.txt
     
     recipes = []
     for recipe_text in recipe_texts:
-        if not recipe_text.strip():
+        recipe_text = recipe_text.strip()
+        if not recipe_text:
             continue
         
         recipe = {}
-        lines = recipe_text.strip().split('\n')
         
-        # Parse basic info
-        for line in lines:
-            if line.startswith('Recipe:'):
+        # Parse basic info and yeast (later lines win, as before)
+        for match in _KEY_RE.finditer(recipe_text):
+            key, line = match.group(1), match.group(0)
+            if key == 'Recipe':
                 recipe['name'] = line.replace('Recipe:', '').strip()
-            elif line.startswith('Style:'):
+            elif key == 'Style':
                 recipe['style'] = line.replace('Style:', '').strip()
-            elif line.startswith('ABV:'):
+            elif key == 'ABV':
                 abv_str = line.replace('ABV:', '').replace('%', '').strip()
                 try:
                     recipe['abv'] = float(abv_str)
                 except:
                     recipe['abv'] = 5.0
-            elif line.startswith('OG:'):
+            elif key == 'OG':
                 try:
                     recipe['og'] = float(line.replace('OG:', '').strip())
                 except:
                     recipe['og'] = 1.050
-            elif line.startswith('FG:'):
+            elif key == 'FG':
                 try:
                     recipe['fg'] = float(line.replace('FG:', '').strip())
                 except:
                     recipe['fg'] = 1.010
-            elif line.startswith('Batch Size:'):
+            elif key == 'Batch Size':
                 batch_str = line.replace('Batch Size:', '').replace('litres', '').strip()
                 try:
                     recipe['batch_size'] = float(batch_str)
                 except:
                     recipe['batch_size'] = 10.0
+            else:
+                recipe['yeast'] = line.replace('Yeast:', '').strip()
         
-        # Parse grain bill
+        # Parse grain bill: "  - 4.5kg Pale Malt"
         grain_bill = []
-        in_grains = False
-        for line in lines:
-            if '<|grainbill|>' in line:
-                in_grains = True
-                continue
-            if '<|hopschedule|>' in line:
-                in_grains = False
-            if in_grains and line.strip().startswith('-'):
-                # Parse grain line: "  - 4.5kg Pale Malt"
-                parts = line.strip().lstrip('- ').split(maxsplit=1)
-                if len(parts) >= 2:
-                    weight_str = parts[0].replace('kg', '').replace('g', '')
-                    try:
-                        weight = float(weight_str)
-                        if 'kg' in parts[0]:
-                            weight = weight * 1000  # Convert to grams
-                        grain_bill.append({'weight': weight, 'type': parts[1]})
-                    except:
-                        pass
+        block = _GRAIN_BLOCK_RE.search(recipe_text)
+        if block:
+            for weight_token, grain_type in _GRAIN_LINE_RE.findall(block.group(1)):
+                try:
+                    weight = float(weight_token.replace('kg', '').replace('g', ''))
+                    if 'kg' in weight_token:
+                        weight = weight * 1000  # Convert to grams
+                    grain_bill.append({'weight': weight, 'type': grain_type})
+                except:
+                    pass
         recipe['grain_bill'] = grain_bill
         
-        # Parse hop schedule
+        # Parse hop schedule: "  - 25g Cascade at 60 min"
         hop_schedule = []
-        in_hops = False
-        for line in lines:
-            if '<|hopschedule|>' in line:
-                in_hops = True
-                continue
-            if '<|yeast|>' in line:
-                in_hops = False
-            if in_hops and line.strip().startswith('-'):
-                # Parse hop line: "  - 25g Cascade at 60 min"
-                parts = line.strip().lstrip('- ').split()
-                if len(parts) >= 4:
-                    try:
-                        weight = float(parts[0].replace('g', ''))
-                        variety = parts[1]
-                        time = float(parts[3])
-                        hop_schedule.append({'weight': weight, 'variety': variety, 'time': time})
-                    except:
-                        pass
+        block = _HOP_BLOCK_RE.search(recipe_text)
+        if block:
+            for weight_token, variety, time_token in _HOP_LINE_RE.findall(block.group(1)):
+                try:
+                    weight = float(weight_token.replace('g', ''))
+                    time = float(time_token)
+                    hop_schedule.append({'weight': weight, 'variety': variety, 'time': time})
+                except:
+                    pass
         recipe['hop_schedule'] = hop_schedule
         
-        # Parse yeast
-        for line in lines:
-            if line.startswith('Yeast:'):
-                recipe['yeast'] = line.replace('Yeast:', '').strip()
-        
         if recipe.get('name'):
             recipes.append(recipe)
     
-    print(f"Loaded {len(recipes)} recipes")
+    if verbose:
+        print(f"Loaded {len(recipes)} recipes")
     return recipes
 
-def build_vocabularies(recipes):
+def build_vocabularies(recipes, verbose=True):
     """Build vocabularies for styles, grains, hops, and yeasts."""
     
     styles = set()
@@ -296,25 +302,30 @@ def build_vocabularies(recipes):
     hops = set()
     yeasts = set()
     
+    # Bound methods hoisted out of the single pass over the recipes
+    add_style, add_grain, add_hop, add_yeast = styles.add, grains.add, hops.add, yeasts.add
+    
     for recipe in recipes:
-        if recipe.get('style'):
-            styles.add(recipe['style'])
+        get = recipe.get
+        style = get('style')
+        if style:
+            add_style(style)
         
-        for grain in recipe.get('grain_bill', []):
+        for grain in get('grain_bill', []):
             if isinstance(grain, dict):
                 grain_type = grain.get('type') or grain.get('name')
                 if grain_type:
-                    grains.add(grain_type)
+                    add_grain(grain_type)
         
-        for hop in recipe.get('hop_schedule', []):
+        for hop in get('hop_schedule', []):
             if isinstance(hop, dict):
                 variety = hop.get('variety') or hop.get('name')
                 if variety:
-                    hops.add(variety)
+                    add_hop(variety)
         
-        yeast = recipe.get('yeast')
+        yeast = get('yeast')
         if yeast:
-            yeasts.add(yeast)
+            add_yeast(yeast)
     
     style_to_idx = {s: i+1 for i, s in enumerate(sorted(styles))}
     style_to_idx['Unknown'] = 0
@@ -328,10 +339,48 @@ def build_vocabularies(recipes):
     yeast_to_idx = {y: i+1 for i, y in enumerate(sorted(yeasts))}
     yeast_to_idx['Unknown'] = 0
     
-    print(f"Vocabularies: {len(style_to_idx)} styles, {len(grain_to_idx)} grains, {len(hop_to_idx)} hops, {len(yeast_to_idx)} yeasts")
+    if verbose:
+        print(f"Vocabularies: {len(style_to_idx)} styles, {len(grain_to_idx)} grains, {len(hop_to_idx)} hops, {len(yeast_to_idx)} yeasts")
     
     return style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx
 
+def masked_mse(pred, target, mask):
+    """Mean squared error over the unpadded slots only."""
+    return ((pred - target) ** 2 * mask).sum() / mask.sum().clamp(min=1)
+
+def slot_cross_entropy(logits, targets):
+    """Cross entropy averaged over non-padding (non-zero) targets; zero if the batch has none."""
+    loss = F.cross_entropy(logits, targets, ignore_index=0, reduction='sum')
+    return loss / (targets != 0).sum().clamp(min=1)
+
+def compute_loss(outputs, targets):
+    """Total training loss over the six output heads."""
+    # Grain losses (predict grain type for each position), as one call over all 5 positions.
+    # Padded grain/hop slots use the Unknown index 0 and are left out of the slot losses.
+    grain_logits = outputs['grain_logits']
+    grain_loss = slot_cross_entropy(
+        grain_logits.unsqueeze(1).expand(-1, 5, -1).reshape(-1, grain_logits.size(-1)),
+        targets['grain_indices'].reshape(-1)
+    )
+    
+    # Grain weight loss
+    weight_loss = masked_mse(outputs['grain_weights'], targets['grain_weights'], targets['grain_mask'])
+    
+    # Hop losses, as one call over all 4 positions
+    hop_logits = outputs['hop_logits']
+    hop_loss = slot_cross_entropy(
+        hop_logits.unsqueeze(1).expand(-1, 4, -1).reshape(-1, hop_logits.size(-1)),
+        targets['hop_indices'].reshape(-1)
+    )
+    
+    hop_weight_loss = masked_mse(outputs['hop_weights'], targets['hop_weights'], targets['hop_mask'])
+    hop_time_loss = masked_mse(outputs['hop_times'], targets['hop_times'], targets['hop_mask'])
+    
+    # Yeast loss
+    yeast_loss = F.cross_entropy(outputs['yeast_logits'], targets['yeast_idx'])
+    
+    return grain_loss + weight_loss + hop_loss + hop_weight_loss + hop_time_loss + yeast_loss
+
 def train_model(
     data_file='data/ml/downsampled_training_data.txt',
     output_file='data/model/recipe_template_model.pt',
@@ -339,23 +388,51 @@ def train_model(
     batch_size=32,
     learning_rate=0.001
 ):
-    """Train the template-based recipe generation model."""
+    """Train the template-based recipe generation model.
+
+    Launched under ``torchrun --nproc_per_node=N``, trains with DistributedDataParallel:
+    each rank takes a disjoint shard of every epoch's shuffle and rank 0 saves the model.
+    """
     
-    print("Loading and preprocessing recipes...")
-    recipes = load_and_preprocess_recipes(data_file)
+    # Allow TF32 tensor cores for the fp32 matmuls and let cuDNN autotune for the fixed batch shape
+    torch.set_float32_matmul_precision('high')
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.benchmark = True
     
-    print("Building vocabularies...")
-    style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx = build_vocabularies(recipes)
+    # torchrun sets WORLD_SIZE/RANK/LOCAL_RANK for each process
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    distributed = world_size > 1
+    if distributed:
+        dist.init_process_group('nccl' if torch.cuda.is_available() else 'gloo')
+        rank = dist.get_rank()
+        local_rank = int(os.environ['LOCAL_RANK'])
+    else:
+        rank = local_rank = 0
+    is_main = rank == 0
     
-    # Create reverse mappings
-    idx_to_style = {v: k for k, v in style_to_idx.items()}
-    idx_to_grain = {v: k for k, v in grain_to_idx.items()}
-    idx_to_hop = {v: k for k, v in hop_to_idx.items()}
-    idx_to_yeast = {v: k for k, v in yeast_to_idx.items()}
+    # Under DDP every rank loads the data, but only rank 0 reports progress
+    if is_main:
+        print("Loading and preprocessing recipes...")
+    recipes = load_and_preprocess_recipes(data_file, verbose=is_main)
     
-    # Create dataset
-    dataset = RecipeDataset(recipes, style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    if is_main:
+        print("Building vocabularies...")
+    style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx = build_vocabularies(recipes, verbose=is_main)
+    
+    if torch.cuda.is_available():
+        device = torch.device('cuda', local_rank)
+        torch.cuda.set_device(device)
+    else:
+        device = torch.device('cpu')
+    
+    # Create dataset; it is only a few MB, so it lives on the training device and
+    # batches are gathered there directly instead of going through a DataLoader
+    dataset = RecipeDataset(recipes, style_to_idx, grain_to_idx, hop_to_idx, yeast_to_idx).to(device)
+    num_recipes = len(dataset)
+    # Every rank must run the same number of steps, so the shuffle is trimmed to a multiple of world_size
+    shard_size = num_recipes // world_size
+    # Drop the ragged last batch so every step has the same shape (one compiled graph, one cuDNN plan)
+    num_batches = max(shard_size // batch_size, 1)
     
     # Initialize model
     model = RecipeGeneratorModel(
@@ -363,71 +440,78 @@ def train_model(
         num_grains=len(grain_to_idx),
         num_hops=len(hop_to_idx),
         num_yeasts=len(yeast_to_idx)
-    )
+    ).to(device)
+    
+    train_net = model
+    if distributed:
+        # DDP allreduces gradients bucket by bucket while the backward pass is still running
+        train_net = DistributedDataParallel(model, device_ids=[local_rank] if device.type == 'cuda' else None)
+    
+    # Compile the forward pass for GPU training; CPU runs stay eager so they don't need a C++ toolchain.
+    # The plain module is kept for saving so the checkpoint's state_dict keys stay loadable by an
+    # uncompiled RecipeGeneratorModel
+    if device.type == 'cuda':
+        train_net = torch.compile(train_net, mode='reduce-overhead', fullgraph=True)
     
-    # Loss functions
-    classification_loss = nn.CrossEntropyLoss()
-    regression_loss = nn.MSELoss()
+    # On CUDA the loss is compiled too, so its elementwise terms and the final sum fuse into few kernels
+    loss_fn = torch.compile(compute_loss, fullgraph=True) if device.type == 'cuda' else compute_loss
     
-    optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
+    # Fused AdamW kernels are only used for CUDA parameters
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate, fused=device.type == 'cuda')
     
-    print(f"\n🍺 Training started for {num_epochs} epochs...")
+    if is_main:
+        print(f"\n🍺 Training started for {num_epochs} epochs...")
     
     for epoch in range(num_epochs):
-        model.train()
-        total_loss = 0
-        
-        for batch_idx, (inputs, targets) in enumerate(dataloader):
-            optimizer.zero_grad()
-            
-            # Forward pass
-            outputs = model(inputs)
-            
-            # Compute losses
-            # Grain losses (predict grain type for each position)
-            grain_loss = 0
-            for i in range(5):
-                grain_loss += classification_loss(outputs['grain_logits'], targets['grain_indices'][:, i])
-            grain_loss /= 5
-            
-            # Grain weight loss
-            weight_loss = regression_loss(outputs['grain_weights'], targets['grain_weights'])
-            
-            # Hop losses
-            hop_loss = 0
-            for i in range(4):
-                hop_loss += classification_loss(outputs['hop_logits'], targets['hop_indices'][:, i])
-            hop_loss /= 4
+        train_net.train()
+        total_loss = torch.zeros((), device=device)
+        
+        if distributed:
+            # Same epoch seed on every rank gives the same shuffle; each rank takes its own stride
+            generator = torch.Generator(device=device)
+            generator.manual_seed(epoch)
+            perm = torch.randperm(num_recipes, device=device, generator=generator)
+            perm = perm[:shard_size * world_size][rank::world_size]
+        else:
+            perm = torch.randperm(num_recipes, device=device)
+        for start in range(0, num_batches * batch_size, batch_size):
+            inputs, targets = dataset[perm[start:start + batch_size]]
             
-            hop_weight_loss = regression_loss(outputs['hop_weights'], targets['hop_weights'])
-            hop_time_loss = regression_loss(outputs['hop_times'], targets['hop_times'])
+            optimizer.zero_grad()
             
-            # Yeast loss
-            yeast_loss = classification_loss(outputs['yeast_logits'], targets['yeast_idx'])
+            # Forward pass in bf16 autocast; outputs are cast back so the losses are computed in fp32
+            with torch.autocast(device_type=device.type, dtype=torch.bfloat16):
+                outputs = train_net(inputs)
+            outputs = {key: value.float() for key, value in outputs.items()}
             
-            # Total loss
-            loss = grain_loss + weight_loss + hop_loss + hop_weight_loss + hop_time_loss + yeast_loss
+            loss = loss_fn(outputs, targets)
             
             loss.backward()
             optimizer.step()
             
-            total_loss += loss.item()
-        
-        avg_loss = total_loss / len(dataloader)
-        print(f"Epoch {epoch+1}/{num_epochs}, Loss: {avg_loss:.4f}")
+            total_loss += loss.detach()
+        
+        # Single device sync per epoch rather than one .item() per batch
+        if distributed:
+            dist.all_reduce(total_loss)
+            total_loss /= world_size
+        avg_loss = total_loss.item() / num_batches
+        if is_main:
+            print(f"Epoch {epoch+1}/{num_epochs}, Loss: {avg_loss:.4f}")
+    
+    if distributed:
+        dist.destroy_process_group()
+    if not is_main:
+        return model
     
-    # Save model and vocabularies
+    # Save model and vocabularies (reverse mappings are rebuilt by load_checkpoint)
     print(f"\n✅ Training complete! Saving model to {output_file}")
     torch.save({
-        'model_state_dict': model.state_dict(),
+        'model_state_dict': {key: value.cpu() for key, value in model.state_dict().items()},
         'style_to_idx': style_to_idx,
         'grain_to_idx': grain_to_idx,
         'hop_to_idx': hop_to_idx,
         'yeast_to_idx': yeast_to_idx,
-        'idx_to_style': idx_to_style,
-        'idx_to_grain': idx_to_grain,
-        'idx_to_hop': idx_to_hop,
-        'idx_to_yeast': idx_to_yeast,
         'num_styles': len(style_to_idx),
         'num_grains': len(grain_to_idx),
         'num_hops': len(hop_to_idx),
@@ -435,12 +519,22 @@ def train_model(
     }, output_file)
     
     print(f"📦 Model saved successfully as single file: {output_file}")
-    print(f"   File size: ~{torch.load(output_file, weights_only=False).__sizeof__() / 1024 / 1024:.2f} MB")
+    print(f"   File size: {os.path.getsize(output_file) / 1024 / 1024:.2f} MB")
     
     return model
 
+def load_checkpoint(path):
+    """Load a saved model checkpoint, rebuilding the idx_to_* reverse vocabularies.
+
+    Older checkpoints that still carry their own reverse mappings are returned as-is.
+    """
+    checkpoint = torch.load(path, weights_only=False)
+    for name in ('style', 'grain', 'hop', 'yeast'):
+        if f'idx_to_{name}' not in checkpoint:
+            checkpoint[f'idx_to_{name}'] = {v: k for k, v in checkpoint[f'{name}_to_idx'].items()}
+    return checkpoint
+
 if __name__ == "__main__":
-    import os
     if not os.path.exists('data/ml/downsampled_training_data.txt'):
         print("Error: downsampled_training_data.txt not found!")
         print("Please run: python bin/create_downsampled_training_data.py")